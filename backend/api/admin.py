@@ -1,45 +1,128 @@
 from django.contrib import admin
-
-from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Prefetch, Q
+from django.utils.functional import cached_property
+
+from foodgram_backend.constants import ADMIN_ESTIMATED_COUNT_THRESHOLD
+from recipes.models import (Ingredient, IngredientInRecipe, Recipe,
                             ShoppingCart, ShortLink, Tag)
+from recipes.search import search_recipes
 from users.models import Following, NewUser
 
 
-class IngrInRecAdmin(admin.StackedInline):
+class EstimatedCountPaginator(Paginator):
+
+    """
+    Пагинатор списков админки. Для всей таблицы без фильтров в PostgreSQL
+    число строк берется из статистики pg_class вместо COUNT(*),
+    если таблица достаточно большая.
+    """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            connection = connections[self.object_list.db]
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'SELECT reltuples FROM pg_class WHERE relname = %s',
+                        [query.model._meta.db_table]
+                    )
+                    row = cursor.fetchone()
+                if row and row[0] >= ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                    return int(row[0])
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+
+    """Админка таблицы, которая может вырасти до миллионов строк."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class RecipeChangeList(ChangeList):
+
+    """Список рецептов без описания: текст в списке не выводится."""
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer('text')
+
+
+class IngrInRecAdmin(admin.TabularInline):
     model = IngredientInRecipe
     extra = 0
+    autocomplete_fields = ('ingredient',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('ingredient')
 
 
 class FollowingAdmin(admin.TabularInline):
     model = Following
     extra = 0
     fk_name = 'user'
+    autocomplete_fields = ('following',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('following')
 
 
 @admin.register(NewUser)
-class NewUserAdmin(admin.ModelAdmin):
+class NewUserAdmin(LargeTableAdmin):
     list_display = ('username', 'email', 'first_name',
-                    'last_name', 'date_joined',)
+                    'last_name', 'date_joined', 'recipes_count',
+                    'followers_count')
     search_fields = ('email', 'username',)
     inlines = (FollowingAdmin,)
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(LargeTableAdmin):
     list_display = ('author', 'name', 'image', 'published',
-                    'text', 'get_tags', 'get_count_favorite')
+                    'get_tags', 'get_count_favorite')
     list_display_links = ('author', 'name')
+    list_select_related = ('author',)
     list_filter = [('tags', admin.RelatedFieldListFilter)]
-    search_fields = ('author__username', 'name')
+    search_fields = ('name', 'author__username')
+    autocomplete_fields = ('author',)
     inlines = (IngrInRecAdmin,)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.only('name'))
+        )
+
+    def get_changelist(self, request, **kwargs):
+        return RecipeChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+
+        """
+        Поиск по названию и описанию через полнотекстовый индекс
+        или по точному имени пользователя автора.
+        """
+
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        matches = search_recipes(queryset, search_term).values('id')
+        return queryset.filter(
+            Q(id__in=matches) | Q(author__username=search_term)
+        ), False
+
     @admin.display(description='Теги')
     def get_tags(self, obj):
-        return [tag.get('name') for tag in obj.tags.values('name')]
+        return [tag.name for tag in obj.tags.all()]
 
-    @admin.display(description='Число добавлений в избранное')
+    @admin.display(description='Число добавлений в избранное',
+                   ordering='favorites_count')
     def get_count_favorite(self, obj):
-        return Favorite.objects.filter(recipe=obj).count()
+        return obj.favorites_count
 
 
 @admin.register(Ingredient)
@@ -55,11 +138,16 @@ class TagAdmin(admin.ModelAdmin):
 
 
 @admin.register(ShortLink)
-class ShortLinkAdmin(admin.ModelAdmin):
+class ShortLinkAdmin(LargeTableAdmin):
     list_display = ('recipe', 'short_code_path', 'original_path')
     list_display_links = ('short_code_path',)
+    list_select_related = ('recipe',)
+    search_fields = ('=short_code_path',)
+    autocomplete_fields = ('recipe',)
 
 
 @admin.register(ShoppingCart)
-class CartAdmin(admin.ModelAdmin):
+class CartAdmin(LargeTableAdmin):
     list_display = ('id', 'user', 'recipe',)
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
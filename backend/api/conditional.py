@@ -0,0 +1,70 @@
+import hashlib
+import json
+from calendar import timegm
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from foodgram_backend.constants import CONDITIONAL_GET_VERSION
+
+
+class ConditionalGetMixin:
+
+    """
+    ETag, Last-Modified и ответ 304 для list и retrieve.
+    Валидаторы строятся из состояния ресурса (get_conditional_state)
+    и версии избранного, корзины и подписок пользователя, поэтому
+    при совпадении сериализация не выполняется.
+    """
+
+    def get_conditional_state(self):
+
+        """
+        Версия ресурса и дата его изменения. Без даты (None) ответ
+        отдается только с ETag. По умолчанию None: без валидаторов.
+        """
+
+        return None
+
+    def get_viewer_state(self):
+        user = self.request.user
+        if user.is_anonymous:
+            return None, None
+        return [user.id, user.state_version], user.state_updated_at
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        state = self.get_conditional_state()
+        if state is None:
+            return handler(request, *args, **kwargs)
+        version, last_modified = state
+        viewer_version, viewer_modified = self.get_viewer_state()
+        # Last-Modified только вместе с датой изменения ресурса: дата
+        # состояния пользователя сама по себе не покрывает изменения ресурса
+        if last_modified is not None and viewer_modified is not None:
+            last_modified = max(last_modified, viewer_modified)
+        content = json.dumps([CONDITIONAL_GET_VERSION,
+                              request.accepted_renderer.format,
+                              viewer_version, version], default=str)
+        etag = quote_etag(hashlib.md5(content.encode()).hexdigest())
+        timestamp = (timegm(last_modified.utctimetuple())
+                     if last_modified is not None else None)
+        response = get_conditional_response(
+            request._request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request,
+                                         *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request,
+                                         *args, **kwargs)
@@ -1,18 +1,207 @@
 import base64
+import binascii
+import hashlib
+import io
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import (InMemoryUploadedFile,
+                                            TemporaryUploadedFile)
+from PIL import Image, ImageFile
 from rest_framework import serializers
 
+from api.images import get_derivative_names
+from foodgram_backend.constants import IMAGE_MAX_DIMENSION, IMAGE_MAX_SIZE
+
+BASE64_SEPARATOR = ';base64,'
+# Переводы строк и пробелы (base64 с переносом строк в стиле MIME)
+BASE64_WHITESPACE = ' \t\n\r\v\f'
+STRIP_WHITESPACE = str.maketrans('', '', BASE64_WHITESPACE)
+# Длина фрагмента base64 кратна 4, чтобы каждый декодировался отдельно
+CHUNK_SIZE = 64 * 1024
+# Сколько байт начала файла читать в поиске размеров изображения
+HEADER_MAX_SIZE = 256 * 1024
+IMAGE_FORMATS = {
+    'JPEG': ('jpg', 'image/jpeg'),
+    'PNG': ('png', 'image/png'),
+    'GIF': ('gif', 'image/gif'),
+    'WEBP': ('webp', 'image/webp'),
+}
+
+
+class ImageHeaderChecker:
+
+    """
+    Проверка формата и размеров изображения по первым байтам файла,
+    до того как изображение получено и декодировано целиком.
+    """
+
+    def __init__(self, field):
+        self.field = field
+        self.parser = ImageFile.Parser()
+        self.received = 0
+        self.image_format = None
+
+    def check(self, image):
+        if image.format not in IMAGE_FORMATS:
+            self.field.fail('invalid_format')
+        if max(image.size) > IMAGE_MAX_DIMENSION:
+            self.field.fail('too_large_dimensions',
+                            max_dimension=IMAGE_MAX_DIMENSION)
+        self.image_format = image.format
+
+    def feed(self, chunk):
+        if self.image_format is not None or self.received > HEADER_MAX_SIZE:
+            return
+        self.received += len(chunk)
+        try:
+            self.parser.feed(chunk)
+        except Image.DecompressionBombError:
+            self.field.fail('too_large_dimensions',
+                            max_dimension=IMAGE_MAX_DIMENSION)
+        except (OSError, SyntaxError, ValueError):
+            self.field.fail('invalid_image')
+        if self.parser.image is not None:
+            self.check(self.parser.image)
+
+    def close(self, upload):
+
+        """
+        Формат по заголовку. Если заголовка не хватило (WebP не читается
+        из неполных данных), файл открывается целиком, но без декодирования.
+        """
+
+        if self.image_format is None:
+            upload.seek(0)
+            try:
+                self.check(Image.open(upload))
+            except Image.DecompressionBombError:
+                self.field.fail('too_large_dimensions',
+                                max_dimension=IMAGE_MAX_DIMENSION)
+            except (OSError, SyntaxError, ValueError):
+                self.field.fail('invalid_image')
+        return self.image_format
+
 
 class Base64ImageField(serializers.ImageField):
 
-    """Сериализатор для преобразования изображения в формат base64."""
+    """
+    Поле изображения в формате base64 (data URI) или multipart-файлом.
+    Строка base64 декодируется фрагментами во временный файл; размер
+    проверяется до декодирования, формат и размеры - по заголовку.
+    Файл сохраняется под именем из хэша содержимого.
+    """
+
+    default_error_messages = {
+        'invalid_base64': 'Некорректные данные изображения в base64.',
+        'invalid_format': 'Поддерживаются форматы: JPEG, PNG, GIF, WEBP.',
+        'too_large_file': ('Размер изображения превышает {max_size} '
+                           'байт.'),
+        'too_large_dimensions': ('Стороны изображения не должны превышать '
+                                 '{max_dimension} пикселей.'),
+    }
+
+    def get_upload(self, size):
+        if size > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+            return TemporaryUploadedFile('upload', None, size, None)
+        return InMemoryUploadedFile(io.BytesIO(), None, 'upload', None,
+                                    size, None)
+
+    def check_size(self, size):
+        if size > IMAGE_MAX_SIZE:
+            self.fail('too_large_file', max_size=IMAGE_MAX_SIZE)
+
+    def finish_upload(self, upload, checker, digest, size):
+        extension, content_type = IMAGE_FORMATS[checker.close(upload)]
+        upload.name = f'{digest.hexdigest()[:32]}.{extension}'
+        upload.content_type = content_type
+        upload.size = size
+        upload.seek(0)
+        return upload
+
+    def get_base64_size(self, data, start):
+
+        """Размер декодированных данных без учета пробелов и переносов."""
+
+        length = len(data) - start - sum(
+            data.count(char, start) for char in BASE64_WHITESPACE
+        )
+        tail = data[max(start, len(data) - 64):].translate(STRIP_WHITESPACE)
+        padding = len(tail) - len(tail.rstrip('='))
+        return length * 3 // 4 - padding
+
+    def decode_base64(self, data):
+        header_end = data.find(BASE64_SEPARATOR, 0, 100)
+        if header_end == -1:
+            self.fail('invalid_base64')
+        start = header_end + len(BASE64_SEPARATOR)
+        size = self.get_base64_size(data, start)
+        self.check_size(size)
+        upload = self.get_upload(size)
+        checker = ImageHeaderChecker(self)
+        digest = hashlib.sha256()
+        # Остаток фрагмента без пробелов, не кратный 4, переносится
+        # в следующий, чтобы каждый фрагмент декодировался отдельно
+        remainder = ''
+        for offset in range(start, len(data), CHUNK_SIZE):
+            chunk = remainder + data[offset:offset + CHUNK_SIZE].translate(
+                STRIP_WHITESPACE
+            )
+            usable = len(chunk) - len(chunk) % 4
+            chunk, remainder = chunk[:usable], chunk[usable:]
+            try:
+                chunk = base64.b64decode(chunk, validate=True)
+            except (binascii.Error, ValueError):
+                self.fail('invalid_base64')
+            checker.feed(chunk)
+            digest.update(chunk)
+            upload.write(chunk)
+        if remainder:
+            self.fail('invalid_base64')
+        return self.finish_upload(upload, checker, digest, size)
+
+    def rename_upload(self, upload):
+        self.check_size(upload.size)
+        checker = ImageHeaderChecker(self)
+        digest = hashlib.sha256()
+        for chunk in upload.chunks():
+            checker.feed(chunk)
+            digest.update(chunk)
+        return self.finish_upload(upload, checker, digest, upload.size)
 
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
+            data = self.decode_base64(data)
+        elif hasattr(data, 'chunks'):
+            data = self.rename_upload(data)
+        return super().to_internal_value(data)
 
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
 
-        return super().to_internal_value(data)
+class ImageDerivativesField(serializers.ReadOnlyField):
+
+    """
+    Ссылки на уменьшенные копии изображения: {размер: {jpg, webp}}.
+    Готовность копий берется из поля модели <image_field>_thumbnails_ready,
+    без обращений к хранилищу. Пока копии не созданы, возвращается None -
+    клиент берет оригинал.
+    """
+
+    def __init__(self, image_field, sizes, **kwargs):
+        self.image_field = image_field
+        self.sizes = sizes
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        image = getattr(instance, self.image_field)
+        if not image or not getattr(
+                instance, f'{self.image_field}_thumbnails_ready'):
+            return None
+        request = self.context.get('request')
+        derivatives = get_derivative_names(image.name, self.sizes)
+        for formats in derivatives.values():
+            for extension, name in formats.items():
+                url = default_storage.url(name)
+                formats[extension] = (request.build_absolute_uri(url)
+                                      if request is not None else url)
+        return derivatives
@@ -1,13 +1,43 @@
 import django_filters
 from rest_framework.filters import SearchFilter
 
-from foodgram_backend.constants import QUERY_PARAM
+from api.recipes.ingredient_index import ingredient_index
+from foodgram_backend.constants import (INGREDIENT_SEARCH_LIMIT,
+                                        INGREDIENT_SEARCH_MAX_LIMIT,
+                                        POPULAR_ORDERING, QUERY_PARAM)
 from recipes.models import Recipe, Tag
+from recipes.search import search_recipes
 
 
 class IngredientsSearchFilter(SearchFilter):
 
+    """
+    Поиск ингредиентов по названию.
+    Для списка используется ранжированный поиск по индексу в памяти,
+    число результатов ограничивается параметром limit.
+    """
+
     search_param = 'name'
+    limit_param = 'limit'
+    default_limit = INGREDIENT_SEARCH_LIMIT
+    max_limit = INGREDIENT_SEARCH_MAX_LIMIT
+
+    def get_name(self, request):
+        return request.query_params.get(self.search_param, '').strip()
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_param])
+        except (KeyError, ValueError):
+            return self.default_limit
+        return min(max(limit, 1), self.max_limit)
+
+    def search(self, request):
+
+        """Ранжированный список ингредиентов для автодополнения."""
+
+        return ingredient_index.search(self.get_name(request),
+                                       self.get_limit(request))
 
 
 class RecipesSearchFilter(django_filters.FilterSet):
@@ -22,10 +52,13 @@ class RecipesSearchFilter(django_filters.FilterSet):
     is_in_shopping_cart = django_filters.CharFilter(
         method='get_recipes_in_shopping_cart'
     )
+    search = django_filters.CharFilter(method='get_search_results')
+    ordering = django_filters.CharFilter(method='get_ordering')
 
     class Meta:
         model = Recipe
-        fields = ['author', 'tags', 'is_favorited', 'is_in_shopping_cart']
+        fields = ['author', 'tags', 'is_favorited', 'is_in_shopping_cart',
+                  'search', 'ordering']
 
     def get_favorite_recipes(self, queryset, name, value):
 
@@ -48,3 +81,20 @@ class RecipesSearchFilter(django_filters.FilterSet):
             return queryset.filter(shopping_cart__user=self.request.user)
         elif value == QUERY_PARAM[0]:
             return queryset.exclude(shopping_cart__user=self.request.user)
+
+    def get_search_results(self, queryset, name, value):
+
+        """Полнотекстовый поиск по названию и описанию рецепта."""
+
+        return search_recipes(queryset, value)
+
+    def get_ordering(self, queryset, name, value):
+
+        """
+        Сортировка по популярности по счетчику favorites_count (индекс).
+        С курсорной пагинацией не поддерживается (ошибка 400).
+        """
+
+        if value == POPULAR_ORDERING:
+            return queryset.order_by('-favorites_count', '-id')
+        return queryset
@@ -0,0 +1,139 @@
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from PIL import Image, ImageOps
+
+DERIVATIVES_DIR = 'derivatives'
+DERIVATIVE_FORMATS = (('jpg', 'JPEG'), ('webp', 'WEBP'))
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def get_derivative_name(name, size, extension):
+
+    """Путь уменьшенной копии: derivatives/<путь оригинала>_<размер>.<ext>"""
+
+    stem = posixpath.splitext(name)[0]
+    return posixpath.join(DERIVATIVES_DIR, f'{stem}_{size}.{extension}')
+
+
+def get_derivative_names(name, sizes):
+    return {
+        str(size): {extension: get_derivative_name(name, size, extension)
+                    for extension, _ in DERIVATIVE_FORMATS}
+        for size in sizes
+    }
+
+
+def derivatives_ready(name, sizes):
+
+    """
+    Копии создаются по возрастанию размера, WebP последним,
+    поэтому достаточно проверить наличие последнего файла.
+    """
+
+    last = get_derivative_name(name, max(sizes), DERIVATIVE_FORMATS[-1][0])
+    return default_storage.exists(last)
+
+
+def save_derivative(image, name, image_format):
+    buffer = ContentFile(b'')
+    if image_format == 'JPEG':
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.save(buffer, image_format, quality=JPEG_QUALITY,
+                   optimize=True, progressive=True)
+    else:
+        image.save(buffer, image_format, quality=WEBP_QUALITY, method=4)
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    default_storage.save(name, buffer)
+
+
+def build_derivatives(name, sizes):
+
+    """Создание JPEG- и WebP-копий изображения для каждого размера."""
+
+    with default_storage.open(name) as original:
+        image = Image.open(original)
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands()
+                                  else 'RGB')
+    for size in sorted(sizes):
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        for extension, image_format in DERIVATIVE_FORMATS:
+            save_derivative(resized,
+                            get_derivative_name(name, size, extension),
+                            image_format)
+
+
+def _build_logged(name, sizes, on_done):
+    try:
+        build_derivatives(name, sizes)
+        if on_done is not None:
+            on_done()
+    except Exception:
+        logger.exception('Не удалось создать копии изображения %s', name)
+    finally:
+        with _pending_lock:
+            _pending.discard(name)
+
+
+def _build_in_thread(name, sizes, on_done):
+
+    """Соединения с БД потока пула закрываются после задачи."""
+
+    try:
+        _build_logged(name, sizes, on_done)
+    finally:
+        connections.close_all()
+
+
+def get_executor():
+
+    """Пул потоков для уменьшенных копий, создается при первом вызове."""
+
+    global _executor
+    if not settings.IMAGE_DERIVATIVE_WORKERS:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_DERIVATIVE_WORKERS,
+                thread_name_prefix='image-derivatives'
+            )
+        return _executor
+
+
+def submit_derivatives(name, sizes, on_done=None):
+
+    """
+    Постановка создания копий в пул потоков; без пула копии
+    создаются сразу. Повторная постановка того же файла пропускается.
+    on_done вызывается после успешного создания копий.
+    """
+
+    with _pending_lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    executor = get_executor()
+    if executor is None:
+        _build_logged(name, sizes, on_done)
+        return
+    executor.submit(_build_in_thread, name, sizes, on_done)
@@ -0,0 +1,171 @@
+import io
+import json
+import platform
+import statistics
+import subprocess
+import time
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.recipes.serializers import RecipeGetSerializer
+from api.recipes.shopping_cart import create_pdf_template
+from api.recipes.views import RecipeViewSet
+from api.users.serializers import NewUserWithRecipeGetSerializer
+from api.users.views import NewUserViewSet
+from recipes.models import Recipe, ShoppingListItem
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+
+    """
+    Замеры сериализаторов, чтения списка покупок и формирования PDF
+    на нескольких масштабах. Результат пишется в JSON для сравнения
+    между коммитами; данные готовит команда seed_load.
+    """
+
+    help = 'Запускает микробенчмарки и сохраняет результаты в JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', type=int, nargs='+',
+                            default=(10, 50, 200))
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--output', default='benchmark_results.json')
+
+    def get_request(self, user, query=''):
+        host = settings.ALLOWED_HOSTS[0].lstrip('.').replace('*', '')
+        request = Request(APIRequestFactory().get(
+            f'/{query}', HTTP_HOST=host or 'localhost'
+        ))
+        request.user = user
+        return request
+
+    def measure(self, name, scale, repeat, func):
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                func()
+                timings.append((time.perf_counter() - start) * 1000)
+        result = {
+            'benchmark': name,
+            'scale': scale,
+            'repeat': repeat,
+            'min_ms': round(min(timings), 3),
+            'median_ms': round(statistics.median(timings), 3),
+            'max_ms': round(max(timings), 3),
+            'queries': len(queries),
+        }
+        self.stdout.write(
+            f'{name} [{scale}]: median {result["median_ms"]} ms, '
+            f'queries {result["queries"]}'
+        )
+        return result
+
+    def bench_recipes(self, user, scale, repeat):
+        view = RecipeViewSet(action='list', format_kwarg=None)
+        view.request = self.get_request(user)
+
+        def run():
+            recipes = list(view.get_queryset()[:scale])
+            return RecipeGetSerializer(
+                recipes, many=True, context={'request': view.request}
+            ).data
+        return self.measure('RecipeGetSerializer', scale, repeat, run)
+
+    def bench_subscriptions(self, user, scale, repeat):
+        request = self.get_request(user, '?recipes_limit=3')
+        view = NewUserViewSet(action='subscriptions', format_kwarg=None)
+        view.request = request
+
+        def run():
+            authors = view.add_recipes_previews(
+                view.get_subscriptions_queryset(request)[:scale], 3
+            )
+            return NewUserWithRecipeGetSerializer(
+                authors, many=True, context={'request': request}
+            ).data
+        return self.measure('NewUserWithRecipeGetSerializer', scale, repeat,
+                            run)
+
+    def get_shopping_list(self, scale):
+
+        """
+        Чтение списка покупок, как в download_shopping_cart: строки
+        ShoppingListItem пользователя с самым длинным списком, не больше
+        scale строк.
+        """
+
+        user_id = ShoppingListItem.objects.values('user_id').annotate(
+            items=Count('id')
+        ).order_by('-items').values_list('user_id', flat=True).first()
+        return ShoppingListItem.objects.filter(user_id=user_id).values(
+            'ingredient__name', 'ingredient__measurement_unit',
+            'total_amount'
+        ).order_by('ingredient__name')[:scale]
+
+    def bench_shopping_list(self, scale, repeat):
+        queryset = self.get_shopping_list(scale)
+
+        def run():
+            return list(queryset.all())
+        return self.measure('shopping_list_read', scale, repeat, run)
+
+    def bench_pdf(self, scale, repeat):
+        rows = list(self.get_shopping_list(scale))
+
+        def run():
+            return create_pdf_template(io.BytesIO(), rows, 'benchmark')
+        return self.measure('create_pdf_template', scale, repeat, run)
+
+    def get_git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], capture_output=True,
+                text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def handle(self, *args, **options):
+        user = User.objects.annotate(
+            follows=Count('follower')
+        ).order_by('-follows', 'id').first()
+        if user is None or not Recipe.objects.exists():
+            raise CommandError('Нет данных: сначала запустите seed_load.')
+        results = []
+        for scale in options['scales']:
+            results.append(self.bench_recipes(user, scale,
+                                              options['repeat']))
+            results.append(self.bench_subscriptions(user, scale,
+                                                    options['repeat']))
+            results.append(self.bench_shopping_list(scale,
+                                                    options['repeat']))
+            results.append(self.bench_pdf(scale, options['repeat']))
+        report = {
+            'meta': {
+                'created': timezone.now().isoformat(),
+                'commit': self.get_git_commit(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'recipes': Recipe.objects.count(),
+                'users': User.objects.count(),
+            },
+            'results': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(
+            f'Результаты сохранены в {options["output"]}'
+        ))
@@ -0,0 +1,51 @@
+import io
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.recipes.shopping_cart import ShoppingListPDFRenderer
+
+
+class Command(BaseCommand):
+
+    """Сравнение времени формирования PDF с загрузкой ресурсов и без."""
+
+    help = ('Замеряет время формирования списка покупок в PDF: '
+            'с загрузкой шрифта и логотипа (cold) и с кэшированными (warm).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=200,
+                            help='Число позиций в списке покупок.')
+        parser.add_argument('--repeat', type=int, default=10,
+                            help='Число повторов для каждого режима.')
+
+    def measure(self, get_renderer, rows, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            get_renderer().render(io.BytesIO(), rows, 'benchmark')
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def handle(self, *args, **options):
+        rows = [
+            {'ingredient__name': f'Ингредиент {number}',
+             'ingredient__measurement_unit': 'г',
+             'total_amount': number}
+            for number in range(options['items'])
+        ]
+        warm_renderer = ShoppingListPDFRenderer()
+        warm_renderer.render(io.BytesIO(), rows[:1], 'benchmark')
+        results = {
+            'cold': self.measure(ShoppingListPDFRenderer, rows,
+                                 options['repeat']),
+            'warm': self.measure(lambda: warm_renderer, rows,
+                                 options['repeat']),
+        }
+        for mode, timings in results.items():
+            self.stdout.write(
+                f'{mode}: median {statistics.median(timings):.1f} ms, '
+                f'min {min(timings):.1f} ms, max {max(timings):.1f} ms '
+                f'({options["items"]} позиций, {options["repeat"]} повторов)'
+            )
@@ -0,0 +1,71 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from api.images import build_derivatives, derivatives_ready
+from api.response_cache import bump_response_version
+from foodgram_backend.constants import AVATAR_IMAGE_SIZES, RECIPE_IMAGE_SIZES
+from recipes.models import Recipe
+from users.models import NewUser
+
+
+class Command(BaseCommand):
+
+    """
+    Создание уменьшенных копий для уже загруженных изображений
+    и отметка о готовых копиях в полях *_thumbnails_ready.
+    """
+
+    help = ('Создает JPEG- и WebP-копии изображений рецептов и аватаров, '
+            'для которых их еще нет, и отмечает готовые копии.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Пересоздать и уже существующие копии.')
+        parser.add_argument('--workers', type=int, default=4)
+
+    def get_images(self, force):
+        sources = (
+            (Recipe.objects.exclude(image=''), 'image', RECIPE_IMAGE_SIZES),
+            (NewUser.objects.exclude(avatar=''), 'avatar',
+             AVATAR_IMAGE_SIZES),
+        )
+        for queryset, field, sizes in sources:
+            queryset = queryset.filter(**{f'{field}__isnull': False})
+            if not force:
+                queryset = queryset.filter(
+                    **{f'{field}_thumbnails_ready': False}
+                )
+            names = queryset.values_list(
+                field, flat=True
+            ).distinct().iterator()
+            for name in names:
+                yield queryset.model, field, name, sizes
+
+    def build(self, Model, field, name, sizes, force):
+        try:
+            if force or not derivatives_ready(name, sizes):
+                build_derivatives(name, sizes)
+        except Exception as error:
+            self.stderr.write(f'{name}: {error}')
+            return False
+        Model.objects.filter(**{field: name}).update(
+            **{f'{field}_thumbnails_ready': True}
+        )
+        return True
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        force = options['force']
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            results = list(executor.map(
+                lambda item: self.build(*item, force),
+                list(self.get_images(force))
+            ))
+        bump_response_version('recipes')
+        built = sum(results)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готовы копии для {built} изображений, ошибок '
+            f'{len(results) - built}, за {time.perf_counter() - start:.1f} с.'
+        ))
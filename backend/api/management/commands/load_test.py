@@ -0,0 +1,281 @@
+import base64
+import io
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+
+from recipes.management.commands.seed_load import SEED_PASSWORD
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, rank):
+
+    """Перцентиль методом ближайшего ранга."""
+
+    ordered = sorted(values)
+    index = max(math.ceil(rank / 100 * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+def get_test_image():
+    buffer = io.BytesIO()
+    Image.new('RGB', (600, 400), (120, 180, 90)).save(buffer, 'JPEG')
+    return ('data:image/jpeg;base64,'
+            + base64.b64encode(buffer.getvalue()).decode())
+
+
+class Stats:
+
+    """Задержки и ошибки по эндпоинтам, общие для всех потоков."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def add(self, endpoint, latency, ok):
+        with self._lock:
+            self.latencies[endpoint].append(latency)
+            if not ok:
+                self.errors[endpoint] += 1
+
+
+class VirtualUser(threading.Thread):
+
+    """Виртуальный пользователь: повторяет сценарий до конца прогона."""
+
+    def __init__(self, number, base_url, token, context, stats, stop_at,
+                 seed):
+        super().__init__(daemon=True)
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+        self.context = context
+        self.stats = stats
+        self.stop_at = stop_at
+        self.rng = random.Random(seed + number)
+        self.session = requests.Session()
+        if token:
+            self.session.headers['Authorization'] = f'Token {token}'
+
+    def call(self, method, endpoint, path, expected=(200,), **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.session.request(
+                method, self.base_url + path, allow_redirects=False,
+                timeout=30, **kwargs
+            )
+            ok = response.status_code in expected
+        except requests.RequestException:
+            response = None
+            ok = False
+        self.stats.add(f'{method} {endpoint}',
+                       (time.perf_counter() - start) * 1000, ok)
+        return response
+
+    def browse(self):
+        recipe_id = self.rng.choice(self.context['recipe_ids'])
+        self.call('GET', '/api/recipes/',
+                  f'/api/recipes/?page={self.rng.randint(1, 5)}&limit=6')
+        self.call('GET', '/api/recipes/{id}/', f'/api/recipes/{recipe_id}/')
+        self.call('GET', '/api/tags/', '/api/tags/')
+        self.call('GET', '/api/ingredients/', '/api/ingredients/',
+                  params={'name': self.rng.choice(('а', 'мо', 'сол', 'к'))})
+        self.call('GET', '/api/users/', '/api/users/?limit=6')
+        response = self.call('GET', '/api/recipes/{id}/get-link/',
+                             f'/api/recipes/{recipe_id}/get-link/')
+        if response is not None and response.ok:
+            short_link = response.json()['short-link']
+            self.call('GET', '/s/{code}/',
+                      '/s/' + short_link.rstrip('/').rsplit('/', 1)[-1] + '/',
+                      expected=(302,))
+
+    def authenticated(self):
+        recipe_id = self.rng.choice(self.context['recipe_ids'])
+        tag = self.rng.choice(self.context['tags'])
+        self.call('GET', '/api/recipes/?filters',
+                  f'/api/recipes/?tags={tag}&is_favorited='
+                  f'{self.rng.choice((0, 1))}&limit=6')
+        self.call('GET', '/api/users/me/', '/api/users/me/')
+        for action in ('favorite', 'shopping_cart'):
+            path = f'/api/recipes/{recipe_id}/{action}/'
+            self.call('POST', f'/api/recipes/{{id}}/{action}/', path,
+                      expected=(201, 400))
+            if action == 'favorite' or self.rng.random() < 0.5:
+                self.call('DELETE', f'/api/recipes/{{id}}/{action}/', path,
+                          expected=(204, 400))
+        self.call('GET', '/api/users/subscriptions/',
+                  '/api/users/subscriptions/?limit=6&recipes_limit=3')
+        if self.rng.random() < 0.2:
+            self.create_recipe()
+        if self.rng.random() < 0.2:
+            self.call('GET', '/api/recipes/download_shopping_cart/',
+                      '/api/recipes/download_shopping_cart/')
+
+    def create_recipe(self):
+        ingredients = self.rng.sample(self.context['ingredient_ids'], 5)
+        response = self.call('POST', '/api/recipes/', '/api/recipes/', json={
+            'ingredients': [{'id': ingredient, 'amount': 100}
+                            for ingredient in ingredients],
+            'tags': [self.rng.choice(self.context['tag_ids'])],
+            'image': self.context['image'],
+            'name': 'Нагрузочный рецепт',
+            'text': 'Создан нагрузочным тестом.',
+            'cooking_time': 10,
+        }, expected=(201,))
+        if response is not None and response.ok:
+            self.call('DELETE', '/api/recipes/{id}/',
+                      f'/api/recipes/{response.json()["id"]}/',
+                      expected=(204,))
+
+    def run(self):
+        while time.monotonic() < self.stop_at:
+            if self.token:
+                self.authenticated()
+            else:
+                self.browse()
+
+
+class Command(BaseCommand):
+
+    """
+    Нагрузочный прогон по HTTP против запущенного сервера.
+    Пользователи для авторизации берутся из seed_load.
+    """
+
+    help = ('Запускает виртуальных пользователей и выводит p50/p95/p99 '
+            'и пропускную способность по эндпоинтам.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://localhost:8000')
+        parser.add_argument('--users', type=int, default=10,
+                            help='Число виртуальных пользователей.')
+        parser.add_argument('--authenticated-share', type=float, default=0.5)
+        parser.add_argument('--duration', type=float, default=30,
+                            help='Длительность прогона, секунды.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='seed',
+                            help='Префикс пользователей из seed_load.')
+        parser.add_argument('--password', default=SEED_PASSWORD)
+        parser.add_argument(
+            '--threshold', action='append', default=[],
+            help='Порог вида "GET /api/recipes/:p95=300" (мс); '
+                 '"*" вместо эндпоинта - для всех.'
+        )
+        parser.add_argument('--max-error-rate', type=float, default=0.01)
+        parser.add_argument('--output', help='Файл для результатов в JSON.')
+
+    def login(self, base_url, number, options):
+        response = requests.post(
+            f'{base_url}/api/auth/token/login/',
+            json={'email': f'{options["prefix"]}_user_{number}@example.com',
+                  'password': options['password']},
+            timeout=30
+        )
+        if response.status_code != 200:
+            raise CommandError(
+                f'Не удалось войти пользователем {number}: '
+                f'{response.status_code} {response.text[:200]}'
+            )
+        return response.json()['auth_token']
+
+    def get_context(self, base_url):
+        recipes = requests.get(f'{base_url}/api/recipes/?limit=100',
+                               timeout=30).json()['results']
+        tags = requests.get(f'{base_url}/api/tags/', timeout=30).json()
+        ingredients = requests.get(f'{base_url}/api/ingredients/',
+                                   params={'name': 'а', 'limit': 100},
+                                   timeout=30).json()
+        if not recipes or not tags or len(ingredients) < 5:
+            raise CommandError('Нет данных: сначала запустите seed_load.')
+        return {
+            'recipe_ids': [recipe['id'] for recipe in recipes],
+            'tags': [tag['slug'] for tag in tags],
+            'tag_ids': [tag['id'] for tag in tags],
+            'ingredient_ids': [ingredient['id']
+                               for ingredient in ingredients],
+            'image': get_test_image(),
+        }
+
+    def parse_thresholds(self, thresholds):
+        parsed = []
+        for threshold in thresholds:
+            try:
+                endpoint, limit = threshold.rsplit(':', 1)
+                metric, value = limit.split('=')
+                rank = int(metric.lstrip('p'))
+                parsed.append((endpoint.strip(), rank, float(value)))
+            except ValueError:
+                raise CommandError(f'Неверный порог: {threshold}')
+            if rank not in PERCENTILES:
+                raise CommandError(
+                    f'Неверный перцентиль в пороге {threshold}, допустимы: '
+                    + ', '.join(f'p{allowed}' for allowed in PERCENTILES)
+                )
+        return parsed
+
+    def handle(self, *args, **options):
+        base_url = options['base_url'].rstrip('/')
+        thresholds = self.parse_thresholds(options['threshold'])
+        context = self.get_context(base_url)
+        authenticated = round(options['users']
+                              * options['authenticated_share'])
+        tokens = [self.login(base_url, number, options)
+                  for number in range(authenticated)]
+        tokens += [None] * (options['users'] - authenticated)
+        stats = Stats()
+        start = time.monotonic()
+        virtual_users = [
+            VirtualUser(number, base_url, token, context, stats,
+                        start + options['duration'], options['seed'])
+            for number, token in enumerate(tokens)
+        ]
+        for virtual_user in virtual_users:
+            virtual_user.start()
+        for virtual_user in virtual_users:
+            virtual_user.join()
+        elapsed = time.monotonic() - start
+        report = {}
+        for endpoint, latencies in sorted(stats.latencies.items()):
+            report[endpoint] = {
+                'requests': len(latencies),
+                'errors': stats.errors[endpoint],
+                'rps': round(len(latencies) / elapsed, 2),
+                **{f'p{rank}': round(percentile(latencies, rank), 2)
+                   for rank in PERCENTILES},
+            }
+            self.stdout.write(
+                f'{endpoint:<48} {len(latencies):>6} req '
+                f'{report[endpoint]["rps"]:>8} rps  '
+                + '  '.join(f'p{rank} {report[endpoint][f"p{rank}"]:>8} ms'
+                            for rank in PERCENTILES)
+                + f'  errors {stats.errors[endpoint]}'
+            )
+        total = sum(item['requests'] for item in report.values())
+        errors = sum(item['errors'] for item in report.values())
+        self.stdout.write(f'Всего: {total} запросов за {elapsed:.1f} с, '
+                          f'{total / elapsed:.1f} rps, ошибок {errors}')
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump({'duration': elapsed, 'users': options['users'],
+                           'endpoints': report}, output,
+                          ensure_ascii=False, indent=2)
+        failures = []
+        if total and errors / total > options['max_error_rate']:
+            failures.append(f'доля ошибок {errors / total:.3f} > '
+                            f'{options["max_error_rate"]}')
+        for endpoint, rank, limit in thresholds:
+            for name, item in report.items():
+                if endpoint in ('*', name) and item[f'p{rank}'] > limit:
+                    failures.append(f'{name}: p{rank} {item[f"p{rank}"]} '
+                                    f'мс > {limit} мс')
+        if failures:
+            raise CommandError('Пороги превышены: ' + '; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Пороги соблюдены.'))
@@ -0,0 +1,175 @@
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+_current_metrics = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+
+    """Метрики одного запроса; экземпляр служит execute_wrapper для БД."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.slowest_sql = None
+        self.slowest_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += duration
+            if duration > self.slowest_time:
+                self.slowest_time = duration
+                self.slowest_sql = sql
+
+
+class MetricsStore:
+
+    """Агрегаты метрик по вью в памяти процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def add(self, view, total_time, metrics):
+        with self._lock:
+            stats = self._views.setdefault(view, {
+                'requests': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                'db_ms': 0.0, 'serializer_ms': 0.0, 'queries': 0,
+                'max_queries': 0, 'slowest_sql': None, 'slowest_sql_ms': 0.0,
+            })
+            stats['requests'] += 1
+            stats['total_ms'] += total_time * 1000
+            stats['max_ms'] = max(stats['max_ms'], total_time * 1000)
+            stats['db_ms'] += metrics.db_time * 1000
+            stats['serializer_ms'] += metrics.serializer_time * 1000
+            stats['queries'] += metrics.queries
+            stats['max_queries'] = max(stats['max_queries'], metrics.queries)
+            if metrics.slowest_time * 1000 > stats['slowest_sql_ms']:
+                stats['slowest_sql_ms'] = metrics.slowest_time * 1000
+                stats['slowest_sql'] = metrics.slowest_sql
+
+    def snapshot(self):
+        with self._lock:
+            views = {view: dict(stats) for view, stats in self._views.items()}
+        for stats in views.values():
+            requests = stats['requests']
+            stats['avg_ms'] = stats['total_ms'] / requests
+            stats['avg_db_ms'] = stats['db_ms'] / requests
+            stats['avg_queries'] = stats['queries'] / requests
+        return views
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
+
+
+metrics_store = MetricsStore()
+
+
+def get_view_name(request):
+    match = request.resolver_match
+    if match is None:
+        return f'{request.method} <unresolved>'
+    return f'{request.method} {match.route or match.view_name}'
+
+
+class RequestMetricsMiddleware:
+
+    """
+    Метрики запросов: число запросов к БД, время БД, самый медленный SQL
+    и время сериализации. Отдаются в заголовке Server-Timing, пишутся в
+    лог и копятся по вью. Включается настройкой REQUEST_METRICS_ENABLED;
+    выключенное middleware исключается из цепочки при старте.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(metrics):
+                response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        total_time = time.perf_counter() - start
+        view = get_view_name(request)
+        metrics_store.add(view, total_time, metrics)
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={metrics.db_time * 1000:.1f};'
+            f'desc="{metrics.queries} queries"',
+            f'serializer;dur={metrics.serializer_time * 1000:.1f}',
+            f'total;dur={total_time * 1000:.1f}',
+        ))
+        logger.info(json.dumps({
+            'view': view,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total_time * 1000, 2),
+            'db_ms': round(metrics.db_time * 1000, 2),
+            'serializer_ms': round(metrics.serializer_time * 1000, 2),
+            'queries': metrics.queries,
+            'slowest_sql_ms': round(metrics.slowest_time * 1000, 2),
+            'slowest_sql': metrics.slowest_sql,
+        }, ensure_ascii=False))
+        return response
+
+
+class SerializerTimingMixin:
+
+    """
+    Замер времени сериализации для вьюсетов.
+    Когда метрики включены, данные сериализатора на чтение вычисляются
+    сразу в get_serializer (serializer.data кэшируется и переиспользуется
+    вью); иначе сериализатор возвращается без изменений.
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        metrics = _current_metrics.get()
+        if metrics is None or 'data' in kwargs or not args:
+            return serializer
+        start = time.perf_counter()
+        serializer.data
+        metrics.serializer_time += time.perf_counter() - start
+        return serializer
+
+
+class RequestMetricsView(APIView):
+
+    """Агрегированные метрики запросов по вью (только администраторам)."""
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response({
+            'enabled': settings.REQUEST_METRICS_ENABLED,
+            'views': metrics_store.snapshot(),
+        })
+
+    def delete(self, request):
+        metrics_store.clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
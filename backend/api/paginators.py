@@ -1,11 +1,194 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import datetime
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 from foodgram_backend.constants import DEFAULT_PAGE_SIZE
 
 
+class CursorJSONEncoder(DjangoJSONEncoder):
+
+    """
+    Кодирование позиции курсора. Дата и время сохраняются с точностью
+    до микросекунды: DjangoJSONEncoder отбрасывает микросекунды,
+    и записи из той же миллисекунды, что и граница страницы, терялись.
+    """
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
 class FoodgramPaginator(PageNumberPagination):
 
     """Стандартная пагинация проекта."""
 
     page_size = DEFAULT_PAGE_SIZE
     page_size_query_param = 'limit'
+
+
+class FoodgramCursorPaginator(BasePagination):
+
+    """
+    Пагинация по ключу (keyset): следующая страница начинается после
+    значений полей ordering последней записи, без COUNT(*) и OFFSET.
+    Все поля ordering сортируются в одном направлении. Параметры
+    из unsupported_query_params меняют порядок выдачи, поэтому вместе
+    с курсором дают ошибку 400, а не страницы в другом порядке.
+    """
+
+    page_size = DEFAULT_PAGE_SIZE
+    page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+    unsupported_params_message = (
+        'Параметры {params} не поддерживаются вместе с курсором.'
+    )
+    ordering = ('-id',)
+    unsupported_query_params = ()
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return page_size if page_size > 0 else self.page_size
+
+    def get_fields(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    def encode_cursor(self, position):
+        data = json.dumps(position, cls=CursorJSONEncoder)
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded))
+            fields = self.get_fields()
+            if not isinstance(position, list) or len(position) != len(
+                    fields):
+                raise ValueError
+            values = []
+            for name, value in zip(fields, position):
+                try:
+                    value = model._meta.get_field(name).to_python(value)
+                except FieldDoesNotExist:
+                    pass
+                values.append(value)
+            return values
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_keyset_filter(self, position):
+
+        """Условие (f1, f2, ...) < (v1, v2, ...); по возрастанию - >."""
+
+        lookup = 'lt' if self.ordering[0].startswith('-') else 'gt'
+        fields = self.get_fields()
+        conditions = []
+        for index, (name, value) in enumerate(zip(fields, position)):
+            condition = {f'{name}__{lookup}': value}
+            condition.update(
+                {fields[previous]: position[previous]
+                 for previous in range(index)}
+            )
+            conditions.append(Q(**condition))
+        return reduce(or_, conditions)
+
+    def check_query_params(self, request):
+        params = [param for param in self.unsupported_query_params
+                  if request.query_params.get(param)]
+        if params:
+            raise ValidationError({
+                self.cursor_query_param: self.unsupported_params_message
+                .format(params=', '.join(params))
+            })
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.check_query_params(request)
+        page_size = self.get_page_size(request)
+        position = self.decode_cursor(request, queryset.model)
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(position))
+        results = list(queryset[:page_size + 1])
+        self.next_position = None
+        if len(results) > page_size:
+            results = results[:page_size]
+            self.next_position = [getattr(results[-1], name)
+                                  for name in self.get_fields()]
+        return results
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(),
+                                   self.cursor_query_param,
+                                   self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+
+class RecipeCursorPaginator(FoodgramCursorPaginator):
+
+    """
+    Пагинация ленты рецептов по (published, id).
+    Рецепты без даты публикации в ленту по курсору не попадают.
+    Поиск по релевантности и сортировка по популярности доступны
+    только с постраничной пагинацией.
+    """
+
+    ordering = ('-published', '-id')
+    unsupported_query_params = ('search', 'ordering')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return super().paginate_queryset(
+            queryset.filter(published__isnull=False), request, view
+        )
+
+
+class SubscriptionCursorPaginator(FoodgramCursorPaginator):
+
+    """Пагинация подписок по id подписки, в порядке подписки."""
+
+    ordering = ('subscription_id',)
+
+
+class CursorPaginationMixin:
+
+    """
+    Выбор пагинации по запросу: с параметром cursor (в том числе пустым)
+    используется cursor_pagination_class, иначе - pagination_class.
+    """
+
+    cursor_pagination_class = None
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            cursor_pagination_class = self.cursor_pagination_class
+            if (cursor_pagination_class is not None
+                    and cursor_pagination_class.cursor_query_param
+                    in self.request.query_params):
+                self._paginator = cursor_pagination_class()
+            else:
+                return super().paginator
+        return self._paginator
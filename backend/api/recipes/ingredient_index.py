@@ -0,0 +1,90 @@
+import threading
+from bisect import bisect_left, bisect_right
+
+from api.response_cache import get_response_version
+from recipes.models import Ingredient
+
+MAX_CHAR = chr(0x10FFFF)
+
+
+def normalize_name(value):
+
+    """Приведение названия к виду для поиска: регистр и ё -> е."""
+
+    return value.casefold().replace('ё', 'е')
+
+
+class IngredientPrefixIndex:
+
+    """
+    Отсортированный in-memory индекс названий ингредиентов.
+    Поиск по префиксу выполняется бинарным поиском без обращения к БД.
+    Индекс хранит общую для процессов версию ответов ингредиентов
+    и перестраивается, когда она меняется: версию меняют сигналы
+    и команда import_ingredients, поэтому изменения из любого процесса
+    попадают во все индексы.
+    Индекс строится при первом поиске, а не в ApiConfig.ready():
+    ready() выполняется и для migrate на пустой БД, и до создания
+    тестовой БД, где таблицы ингредиентов еще нет.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+
+    def _build(self, version):
+        entries = sorted(
+            (normalize_name(row['name']), row['id'], row)
+            for row in Ingredient.objects.values(
+                'id', 'name', 'measurement_unit'
+            )
+        )
+        keys = [key for key, _, _ in entries]
+        rows = [row for _, _, row in entries]
+        return keys, rows, version
+
+    def get_data(self):
+        version = get_response_version('ingredients')
+        data = self._data
+        if data is None or data[2] != version:
+            with self._lock:
+                data = self._data
+                if data is None or data[2] != version:
+                    data = self._data = self._build(version)
+        return data
+
+    def search(self, query, limit):
+
+        """
+        Ранжированный поиск ингредиентов, не более limit результатов.
+        Порядок: точное совпадение, начало названия, начало слова
+        в названии, вхождение в любом месте.
+        """
+
+        keys, rows, _ = self.get_data()
+        query = normalize_name(query)
+        start = bisect_left(keys, query)
+        end = bisect_right(keys, query + MAX_CHAR, lo=start)
+        results = rows[start:min(end, start + limit)]
+        if len(results) >= limit:
+            return results
+        word_matches = []
+        substring_matches = []
+        for position, key in enumerate(keys):
+            if start <= position < end:
+                continue
+            found = key.find(query)
+            if found < 0:
+                continue
+            while found > 0 and key[found - 1].isalnum():
+                found = key.find(query, found + 1)
+            if found > 0:
+                word_matches.append(rows[position])
+                if len(results) + len(word_matches) >= limit:
+                    break
+            else:
+                substring_matches.append(rows[position])
+        return (results + word_matches + substring_matches)[:limit]
+
+
+ingredient_index = IngredientPrefixIndex()
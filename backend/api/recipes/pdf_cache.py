@@ -0,0 +1,139 @@
+import hashlib
+import io
+import json
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.cache import caches
+
+from api.recipes.shopping_cart import create_pdf_template
+from foodgram_backend.constants import (PDF_CACHE_KEY_VERSION,
+                                        PDF_FAILURE_TIMEOUT,
+                                        PDF_PENDING_TIMEOUT)
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def get_pdf_cache():
+    return caches[settings.SHOPPING_LIST_PDF_CACHE]
+
+
+def get_pdf_cache_key(username, rows):
+
+    """Ключ кэша - хэш содержимого списка покупок и имени пользователя."""
+
+    content = json.dumps([username, [list(row.values()) for row in rows]],
+                         ensure_ascii=False)
+    digest = hashlib.sha256(content.encode()).hexdigest()
+    return f'shopping_list_pdf:{PDF_CACHE_KEY_VERSION}:{digest}'
+
+
+def get_pending_key(key):
+    return f'{key}:pending'
+
+
+def get_failed_key(key):
+    return f'{key}:failed'
+
+
+def render_pdf_bytes(rows, username):
+
+    """Формирование PDF в байты; выполняется в процессе пула."""
+
+    return create_pdf_template(io.BytesIO(), rows, username).getvalue()
+
+
+def get_executor():
+
+    """Пул процессов для формирования PDF, создается при первом вызове."""
+
+    global _executor
+    if not settings.PDF_RENDER_WORKERS:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.PDF_RENDER_WORKERS
+            )
+        return _executor
+
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        _executor = None
+
+
+def _store_result(key, future):
+
+    """
+    Сохранение PDF из пула в кэш. Ошибка формирования записывается
+    в журнал и отмечается в общем кэше: следующий запрос формирует
+    PDF сразу, а не ждет результата, которого не будет.
+    """
+
+    with _pending_lock:
+        _pending.pop(key, None)
+    cache = get_pdf_cache()
+    error = None if future.cancelled() else future.exception()
+    if future.cancelled() or error is not None:
+        if isinstance(error, BrokenProcessPool):
+            _reset_executor()
+        logger.error('Не удалось сформировать PDF %s', key, exc_info=error)
+        cache.set(get_failed_key(key), True, PDF_FAILURE_TIMEOUT)
+    else:
+        cache.set(key, future.result())
+    cache.delete(get_pending_key(key))
+
+
+def submit_pdf_rendering(key, rows, username):
+
+    """
+    Постановка формирования PDF в пул процессов. Возвращает True, если
+    PDF формируется в фоне. Отметка в общем кэше не дает другим
+    процессам поставить тот же ключ повторно. После недавней ошибки
+    формирования в фоне возвращается False - PDF формируется в запросе.
+    """
+
+    cache = get_pdf_cache()
+    with _pending_lock:
+        if key in _pending:
+            return True
+        executor = get_executor()
+        if executor is None or cache.get(get_failed_key(key)):
+            return False
+        if not cache.add(get_pending_key(key), True, PDF_PENDING_TIMEOUT):
+            return True
+        try:
+            future = executor.submit(render_pdf_bytes, rows, username)
+        except BrokenProcessPool:
+            _reset_executor()
+            cache.delete(get_pending_key(key))
+            return False
+        _pending[key] = future
+    future.add_done_callback(lambda done: _store_result(key, done))
+    return True
+
+
+def render_pdf_response(response, key, rows, username):
+
+    """
+    PDF из кэша или, при промахе, формирование сразу в ответ
+    в процессе запроса с сохранением в кэш.
+    """
+
+    pdf = get_pdf_cache().get(key)
+    if pdf is not None:
+        response.write(pdf)
+        return response
+    create_pdf_template(response, rows, username)
+    get_pdf_cache().set(key, response.content)
+    return response
@@ -1,13 +1,14 @@
-import random
-import string
-
+from django.db import transaction
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
-from api.fields import Base64ImageField
+from api.fields import Base64ImageField, ImageDerivativesField
 from api.users.serializers import NewUserGetSerializer
+from foodgram_backend.constants import BULK_RECIPES_LIMIT, RECIPE_IMAGE_SIZES
 from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
                             ShoppingCart, ShortLink, Tag)
+from recipes.shopping_list import update_shopping_lists_for_recipe
+from recipes.short_codes import get_original_path, get_short_code
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -46,9 +47,13 @@ class IngredientInRecipeGetSerializer(serializers.ModelSerializer):
 
 class IngredientInRecipeCreateSerializer(serializers.Serializer):
 
-    """Сериализатор ингрендиентов в рецепте при его создании."""
+    """
+    Сериализатор ингрендиентов в рецепте при его создании.
+    Существование ингредиентов проверяется одним запросом
+    в RecipeCreateSerializer.validate_ingredients().
+    """
 
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField(min_value=1)
     amount = serializers.IntegerField(min_value=1)
 
     class Meta:
@@ -66,9 +71,8 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
     cooking_time = serializers.IntegerField(required=True, min_value=1)
     author = NewUserGetSerializer(read_only=True)
     ingredients = IngredientInRecipeCreateSerializer(many=True)
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True,
+    tags = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
         required=True
     )
 
@@ -77,6 +81,33 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         fields = ['ingredients', 'tags', 'image', 'name',
                   'text', 'cooking_time', 'author']
 
+    def get_missing_ids(self, Model, ids):
+
+        """id из списка, которых нет в таблице модели (один запрос)."""
+
+        found = set(Model.objects.filter(id__in=ids).values_list('id',
+                                                                 flat=True))
+        return sorted(set(ids) - found)
+
+    def validate_ingredients(self, value):
+        missing = self.get_missing_ids(
+            Ingredient, [ingredient['id'] for ingredient in value]
+        )
+        if missing:
+            raise ValidationError(
+                'Ингредиенты не найдены: '
+                f'{", ".join(map(str, missing))}.'
+            )
+        return value
+
+    def validate_tags(self, value):
+        missing = self.get_missing_ids(Tag, value)
+        if missing:
+            raise ValidationError(
+                f'Теги не найдены: {", ".join(map(str, missing))}.'
+            )
+        return value
+
     def validate(self, initial_data):
         ingredients = initial_data.get('ingredients')
         tags = initial_data.get('tags')
@@ -99,15 +130,19 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             ingredient_instance = IngredientInRecipe(
                 recipe=recipe,
                 amount=ingredient.get('amount'),
-                ingredient=ingredient.get('id')
+                ingredient_id=ingredient.get('id')
             )
             ingredient_list.append(ingredient_instance)
         IngredientInRecipe.objects.bulk_create(ingredient_list)
         return recipe
 
+    @transaction.atomic
     def create(self, validated_data):
 
-        """Переопределение create() для вложенных сериализаторов."""
+        """
+        Переопределение create() для вложенных сериализаторов.
+        Рецепт, теги и ингредиенты создаются в одной транзакции.
+        """
 
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
@@ -116,25 +151,76 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         self.create_update_ingredients(ingredients, recipe)
         return recipe
 
+    def update_ingredients(self, instance, ingredients):
+
+        """
+        Изменение ингредиентов рецепта по разнице со старым составом:
+        меняются только строки с новым количеством, удаляются только
+        убранные ингредиенты, создаются только добавленные.
+        """
+
+        current = {
+            item.ingredient_id: item
+            for item in IngredientInRecipe.objects.filter(recipe=instance)
+        }
+        old_amounts = {ingredient_id: item.amount
+                       for ingredient_id, item in current.items()}
+        new_amounts = {ingredient.get('id'): ingredient.get('amount')
+                       for ingredient in ingredients}
+        changed = []
+        for ingredient_id, item in current.items():
+            amount = new_amounts.get(ingredient_id)
+            if amount is not None and amount != item.amount:
+                item.amount = amount
+                changed.append(item)
+        IngredientInRecipe.objects.bulk_update(changed, ['amount'])
+        removed = old_amounts.keys() - new_amounts.keys()
+        if removed:
+            IngredientInRecipe.objects.filter(
+                recipe=instance, ingredient_id__in=removed
+            ).delete()
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(recipe=instance, ingredient_id=ingredient_id,
+                               amount=amount)
+            for ingredient_id, amount in new_amounts.items()
+            if ingredient_id not in current
+        )
+        update_shopping_lists_for_recipe(instance, old_amounts, new_amounts)
+
+    def update_tags(self, instance, tags):
+
+        """Изменение тегов рецепта по разнице со старым набором."""
+
+        current = set(instance.tags.values_list('id', flat=True))
+        new = set(tags)
+        if current - new:
+            instance.tags.remove(*(current - new))
+        if new - current:
+            instance.tags.add(*(new - current))
+
+    @transaction.atomic
     def update(self, instance, validated_data):
 
-        """Переопределение update() для вложенных сериализаторов."""
+        """
+        Переопределение update() для вложенных сериализаторов.
+        Ингредиенты и теги меняются по разнице, рецепт сохраняется
+        один раз, списки покупок пересчитываются в той же транзакции.
+        """
 
-        ingredients = validated_data.pop('ingredients')
-        tags = validated_data.pop('tags')
-        if ingredients:
-            IngredientInRecipe.objects.filter(recipe=instance).delete()
-            instance = self.create_update_ingredients(ingredients, instance)
-            super().update(instance, validated_data)
-        if tags:
-            instance.tags.clear()
-            instance.tags.set(tags)
+        self.update_ingredients(instance, validated_data.pop('ingredients'))
+        self.update_tags(instance, validated_data.pop('tags'))
         return super().update(instance, validated_data)
 
     def to_representation(self, value):
 
-        """Переопределение to_representation() для правильного response."""
+        """
+        Переопределение to_representation() для правильного response.
+        Рецепт перечитывается с ингредиентами и тегами за три запроса.
+        """
 
+        value = Recipe.objects.select_related('author').prefetch_related(
+            'tags', 'ingredients_in_recipe__ingredient'
+        ).get(pk=value.pk)
         serializer = RecipeGetSerializer(value)
         return serializer.data
 
@@ -144,6 +230,8 @@ class RecipeGetSerializer(serializers.ModelSerializer):
     """Сериализатор получения рецепта."""
 
     image = Base64ImageField(required=True)
+    image_thumbnails = ImageDerivativesField('image',
+                                             sizes=RECIPE_IMAGE_SIZES)
     name = serializers.CharField(required=True)
     text = serializers.CharField(required=True)
     cooking_time = serializers.IntegerField(required=True)
@@ -160,14 +248,28 @@ class RecipeGetSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = [
-            'id', 'ingredients', 'tags', 'image', 'name', 'text',
-            'cooking_time', 'author', 'is_in_shopping_cart', 'is_favorited'
+            'id', 'ingredients', 'tags', 'image', 'image_thumbnails', 'name',
+            'text', 'cooking_time', 'author', 'is_in_shopping_cart',
+            'is_favorited'
         ]
 
-    def get_boolean_value_field(self, obj, Model):
+    def to_representation(self, instance):
+
+        """Передача аннотации подписки на автора в NewUserGetSerializer."""
+
+        if hasattr(instance, 'is_author_subscribed'):
+            instance.author.is_subscribed = instance.is_author_subscribed
+        return super().to_representation(instance)
 
-        """Получение значения поля для is_favorited и shopping_cart."""
+    def get_boolean_value_field(self, obj, Model, annotation):
 
+        """
+        Получение значения поля для is_favorited и shopping_cart.
+        Если queryset аннотирован во вьюсете, запрос к БД не выполняется.
+        """
+
+        if hasattr(obj, annotation):
+            return getattr(obj, annotation)
         request = self.context.get('request')
         if request:
             current_user = request.user
@@ -180,13 +282,14 @@ class RecipeGetSerializer(serializers.ModelSerializer):
 
         """Рецепты в избранном у пользователя."""
 
-        return self.get_boolean_value_field(obj, Favorite)
+        return self.get_boolean_value_field(obj, Favorite, 'is_favorited')
 
     def get_is_in_shopping_cart(self, obj):
 
         """Рецепты в корзине у корзине у пользователя."""
 
-        return self.get_boolean_value_field(obj, ShoppingCart)
+        return self.get_boolean_value_field(obj, ShoppingCart,
+                                            'is_in_shopping_cart')
 
 
 class FavoriteSerializer(serializers.ModelSerializer):
@@ -241,9 +344,29 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
         return serializer.data
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+
+    """Список id рецептов для пакетной работы с избранным и корзиной."""
+
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_RECIPES_LIMIT
+    )
+
+    def validate_recipes(self, value):
+
+        """Повторы убираются с сохранением порядка."""
+
+        return list(dict.fromkeys(value))
+
+
 class ShortRecipeGetSerializer(serializers.ModelSerializer):
+    image_thumbnails = ImageDerivativesField('image',
+                                             sizes=RECIPE_IMAGE_SIZES)
+
     class Meta:
-        fields = ['id', 'name', 'image', 'cooking_time']
+        fields = ['id', 'name', 'image', 'image_thumbnails', 'cooking_time']
         model = Recipe
 
 
@@ -267,30 +390,26 @@ class ShortLinkSerializer(serializers.ModelSerializer):
         fields["short-link"] = fields.pop("short_link")
         return fields
 
-    @classmethod
-    def create_short_url(self, obj, request):
-
-        """Создание короткой ссылки на рецепт."""
-
-        symbols = string.digits + string.ascii_lowercase + \
-            string.ascii_uppercase
-        short_code_path = ''.join(random.choice(symbols) for i in range(4))
-        obj.short_code_path = short_code_path
-        obj.save()
-        return short_code_path
-
     def get_short_link_in_response(self, obj):
 
-        """Получение адреса с короткой ссылкой в response."""
+        """
+        Получение адреса с короткой ссылкой в response.
+        Ссылка создается вместе с рецептом, поэтому обычно это только
+        чтение; для рецептов без ссылки она создается одной вставкой.
+        """
 
         request = self.context.get('request')
-        original_path = f'/recipes/{obj.id}'
-        obj, created = ShortLink.objects.get_or_create(
-            recipe=obj,
-            original_path=original_path)
-        if not obj.short_code_path or created:
-            self.create_short_url(obj, request)
+        short_code_path = ShortLink.objects.filter(
+            recipe=obj
+        ).values_list('short_code_path', flat=True).first()
+        if short_code_path is None:
+            short_link, _ = ShortLink.objects.get_or_create(
+                short_code_path=get_short_code(obj.id),
+                defaults={'recipe': obj,
+                          'original_path': get_original_path(obj.id)}
+            )
+            short_code_path = short_link.short_code_path
         short_absolute_uri = request.build_absolute_uri(
-            f'/s/{obj.short_code_path}/'
+            f'/s/{short_code_path}/'
         )
         return short_absolute_uri
@@ -1,3 +1,9 @@
+import csv
+import io
+import json
+import threading
+
+from django.conf import settings
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
 from reportlab.pdfbase import pdfmetrics
@@ -5,50 +11,148 @@ from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.platypus import (Image, ListFlowable, ListItem, Paragraph,
                                 SimpleDocTemplate, Spacer)
 
+FONT_NAME = 'Roboto'
+FONT_PATH = settings.BASE_DIR / 'api/data/fonts/Roboto-Regular.ttf'
+LOGO_PATH = settings.BASE_DIR / 'api/data/logo_foodgram.png'
+
+
+class ShoppingListPDFRenderer:
+
+    """
+    Формирование списка покупок в формате *.pdf.
+    Шрифт, логотип и стили загружаются один раз при первом использовании
+    и переиспользуются всеми запросами процесса.
+    """
+
+    def __init__(self, font_path=FONT_PATH, logo_path=LOGO_PATH):
+        self.font_path = font_path
+        self.logo_path = logo_path
+        self._lock = threading.Lock()
+        self._resources = None
+
+    def _load_resources(self):
+
+        """Загрузка шрифта, логотипа и стилей."""
+
+        pdfmetrics.registerFont(TTFont(FONT_NAME, self.font_path, 'UTF-8'))
+        with open(self.logo_path, 'rb') as logo_file:
+            logo_data = logo_file.read()
+        styles = getSampleStyleSheet()
+        header_style = ParagraphStyle(
+            name='HeaderStyle',
+            parent=styles['Heading1'],
+            fontName=FONT_NAME,
+            fontSize=18,
+            alignment=1
+        )
+        row_style = ParagraphStyle(
+            name='RowStyle',
+            parent=styles['Normal'],
+            fontName=FONT_NAME,
+            fontSize=16,
+            leading=20,
+            wordWrap='CJK'
+        )
+        return logo_data, header_style, row_style
+
+    @property
+    def resources(self):
+        if self._resources is None:
+            with self._lock:
+                if self._resources is None:
+                    self._resources = self._load_resources()
+        return self._resources
+
+    def render(self, stream, queryset, username):
+
+        """Запись списка покупок в stream (файл, буфер или response)."""
+
+        logo_data, header_style, row_style = self.resources
+        pdf_template = SimpleDocTemplate(stream, pagesize=A4)
+        logo = Image(io.BytesIO(logo_data), width=159, height=43)
+        space_after_logo = Spacer(1, 30)
+        header_text = Paragraph(
+            f'Привет, {username}! Список ингредиентов для покупки '
+            'сформирован.',
+            header_style
+        )
+        space_after_header = Spacer(1, 30)
+        result_data = [logo, space_after_logo, header_text,
+                       space_after_header]
+        list_items = []
+        for row in queryset:
+            ingredient_row = "{}, {}  -  {}".format(*row.values())
+            list_items.append(
+                ListItem(Paragraph(ingredient_row, style=row_style))
+            )
+        bullet_list = ListFlowable(list_items,
+                                   bulletType='bullet',
+                                   bulletFontName=FONT_NAME,
+                                   bulletFontSize=20, bulletColor='black')
+
+        result_data.append(bullet_list)
+
+        pdf_template.build(result_data)
+        return stream
+
+
+pdf_renderer = ShoppingListPDFRenderer()
+
 
 def create_pdf_template(buffer, queryset, username):
 
     """Формирование списка покупок в формате *.pdf"""
 
-    pdfmetrics.registerFont(TTFont(
-        'Roboto', 'api/data/fonts/Roboto-Regular.ttf', 'UTF-8'
-    ))
-    pdf_template = SimpleDocTemplate(buffer, pagesize=A4)
-    logo = Image('api/data/logo_foodgram.png', width=159, height=43)
-    space_after_logo = Spacer(1, 30)
-    styles = getSampleStyleSheet()
-    header_style = ParagraphStyle(
-        name='HeaderStyle',
-        parent=styles['Heading1'],
-        fontName='Roboto',
-        fontSize=18,
-        alignment=1
-    )
-    row_style = ParagraphStyle(
-        name='RowStyle',
-        parent=styles['Normal'],
-        fontName='Roboto',
-        fontSize=16,
-        leading=20,
-        wordWrap='CJK'
-    )
-    header_text = Paragraph(
-        f'Привет, {username}! Список ингредиентов для покупки сформирован.',
-        header_style
-    )
-    space_after_header = Spacer(1, 30)
-    result_data = [logo, space_after_logo, header_text, space_after_header]
-    list_items = []
+    pdf_renderer.render(buffer, queryset, username)
+    if hasattr(buffer, 'seek'):
+        buffer.seek(0)
+    return buffer
+
+
+class Echo:
+
+    """Псевдобуфер для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def stream_txt(queryset):
+
+    """Построчная выгрузка списка покупок в формате *.txt"""
+
+    for name, measurement_unit, amount in queryset:
+        yield f'{name}, {measurement_unit}  -  {amount}\n'
+
+
+def stream_csv(queryset):
+
+    """Построчная выгрузка списка покупок в формате *.csv"""
+
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
     for row in queryset:
-        ingredient_row = "{}, {}  -  {}".format(*row.values())
-        list_items.append(ListItem(Paragraph(ingredient_row, style=row_style)))
-    bullet_list = ListFlowable(list_items,
-                               bulletType='bullet',
-                               bulletFontName='Roboto',
-                               bulletFontSize=20, bulletColor='black')
+        yield writer.writerow(row)
 
-    result_data.append(bullet_list)
 
-    pdf_template.build(result_data)
-    buffer.seek(0)
-    return buffer
+def stream_json(queryset):
+
+    """Поэлементная выгрузка списка покупок в формате *.json"""
+
+    yield '['
+    separator = ''
+    for name, measurement_unit, amount in queryset:
+        yield separator + json.dumps(
+            {'name': name, 'measurement_unit': measurement_unit,
+             'amount': amount},
+            ensure_ascii=False
+        )
+        separator = ', '
+    yield ']'
+
+
+SHOPPING_LIST_STREAMS = {
+    'txt': (stream_txt, 'text/plain; charset=utf-8'),
+    'csv': (stream_csv, 'text/csv; charset=utf-8'),
+    'json': (stream_json, 'application/json'),
+}
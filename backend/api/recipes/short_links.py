@@ -0,0 +1,98 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from foodgram_backend.constants import (SHORT_LINK_CACHE_SIZE,
+                                        SHORT_LINK_CACHE_TIMEOUT,
+                                        SHORT_LINK_LOCAL_TIMEOUT)
+from recipes.models import ShortLink
+
+
+class ShortLinkResolver:
+
+    """
+    Кэш соответствия короткого кода и адреса рецепта.
+    Первый уровень - LRU в памяти процесса, второй - общий кэш Django
+    (settings.SHORT_LINK_CACHE, None - не используется), затем БД.
+    Коды не меняются, поэтому сбрасываются только при удалении: запись
+    удаляется из общего кэша и LRU своего процесса, а в остальных
+    процессах LRU устаревает через local_timeout секунд.
+    """
+
+    def __init__(self, maxsize=SHORT_LINK_CACHE_SIZE,
+                 timeout=SHORT_LINK_CACHE_TIMEOUT,
+                 local_timeout=SHORT_LINK_LOCAL_TIMEOUT):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.local_timeout = local_timeout
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    @property
+    def shared_cache(self):
+        if settings.SHORT_LINK_CACHE is None:
+            return None
+        return caches[settings.SHORT_LINK_CACHE]
+
+    @staticmethod
+    def get_cache_key(short_code_path):
+        return f'short_link:{short_code_path}'
+
+    def _get_local(self, short_code_path):
+        with self._lock:
+            entry = self._entries.get(short_code_path)
+            if entry is None:
+                return None
+            original_path, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[short_code_path]
+                return None
+            self._entries.move_to_end(short_code_path)
+            return original_path
+
+    def _set_local(self, short_code_path, original_path):
+        with self._lock:
+            self._entries[short_code_path] = (
+                original_path, time.monotonic() + self.local_timeout
+            )
+            self._entries.move_to_end(short_code_path)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def resolve(self, short_code_path):
+
+        """Адрес рецепта по короткому коду или None."""
+
+        original_path = self._get_local(short_code_path)
+        if original_path is not None:
+            return original_path
+        shared_cache = self.shared_cache
+        key = self.get_cache_key(short_code_path)
+        if shared_cache is not None:
+            original_path = shared_cache.get(key)
+        if original_path is None:
+            original_path = ShortLink.objects.filter(
+                short_code_path=short_code_path
+            ).values_list('original_path', flat=True).first()
+            if original_path is None:
+                return None
+            if shared_cache is not None:
+                shared_cache.set(key, original_path, self.timeout)
+        self._set_local(short_code_path, original_path)
+        return original_path
+
+    def invalidate(self, short_code_path):
+
+        """Удаление кода из общего кэша и LRU своего процесса."""
+
+        with self._lock:
+            self._entries.pop(short_code_path, None)
+        shared_cache = self.shared_cache
+        if shared_cache is not None:
+            shared_cache.delete(self.get_cache_key(short_code_path))
+
+
+short_link_resolver = ShortLinkResolver()
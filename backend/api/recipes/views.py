@@ -1,53 +1,75 @@
-import io
-
-from django.db.models import Sum
-from django.http import FileResponse
-from django.shortcuts import get_object_or_404, redirect
+from django.db import connections, transaction
+from django.db.models import BooleanField, Exists, OuterRef, Prefetch, Value
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import redirect
+from django.views import View
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import decorators, status, viewsets
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.views import APIView
 
+from api.conditional import ConditionalGetMixin
 from api.filters import IngredientsSearchFilter, RecipesSearchFilter
-from api.paginators import FoodgramPaginator
+from api.metrics import SerializerTimingMixin
+from api.paginators import (CursorPaginationMixin, FoodgramPaginator,
+                            RecipeCursorPaginator)
 from api.permissions import IsOwnerOrReadOnly
+from api.renderers import (CSVShoppingListRenderer, JSONShoppingListRenderer,
+                           PDFShoppingListRenderer, TextShoppingListRenderer)
 from api.recipes.serializers import (FavoriteSerializer, IngredientSerializer,
                                      RecipeCreateSerializer,
                                      RecipeGetSerializer,
+                                     RecipeIdsSerializer,
                                      ShoppingCartSerializer,
                                      ShortLinkSerializer, TagSerializer)
-from api.recipes.shopping_cart import create_pdf_template
-from recipes.models import (Favorite, Ingredient, Recipe, ShoppingCart,
-                            ShortLink, Tag)
-
-
-class ShortLinkRedirectView(APIView):
-
-    """Вью-класс для редиректа с короткой ссылки рецепта на прямую."""
-
-    permission_classes = (AllowAny,)
+from api.recipes.pdf_cache import (get_pdf_cache, get_pdf_cache_key,
+                                   render_pdf_response, submit_pdf_rendering)
+from api.recipes.shopping_cart import SHOPPING_LIST_STREAMS
+from api.recipes.short_links import short_link_resolver
+from api.response_cache import (CachedResponseMixin,
+                                bump_response_version_on_commit,
+                                get_response_version)
+from foodgram_backend.constants import POPULAR_ORDERING, QUERY_PARAM
+from recipes.counters import change_favorites_count
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingCart, ShoppingListItem, Tag)
+from recipes.shopping_list import update_shopping_list
+from users.models import Following
+from users.state import bump_state_version
+
+
+class ShortLinkRedirectView(View):
+
+    """
+    Вью-класс для редиректа с короткой ссылки рецепта на прямую.
+    Обычный Django View: без аутентификации и согласования контента DRF.
+    """
 
     def get(self, request, short_code_path):
-        obj = get_object_or_404(ShortLink,
-                                short_code_path=short_code_path)
-        return redirect(obj.original_path)
+        original_path = short_link_resolver.resolve(short_code_path)
+        if original_path is None:
+            raise Http404
+        return redirect(original_path)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CachedResponseMixin, SerializerTimingMixin,
+                 viewsets.ReadOnlyModelViewSet):
 
     """Вьюсет тегов."""
 
+    response_cache_namespace = 'tags'
     serializer_class = TagSerializer
     model = Tag
     queryset = Tag.objects.all()
     permission_classes = (AllowAny,)
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CachedResponseMixin, SerializerTimingMixin,
+                        viewsets.ReadOnlyModelViewSet):
 
     """Вьюсет ингредиентов."""
 
+    response_cache_namespace = 'ingredients'
     serializer_class = IngredientSerializer
     model = Ingredient
     permission_classes = (AllowAny,)
@@ -55,8 +77,21 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = (IngredientsSearchFilter,)
     search_fields = ('^name',)
 
+    def list(self, request, *args, **kwargs):
+
+        """
+        Поиск по названию обслуживается индексом в памяти,
+        полный список - кэшем готовых ответов.
+        """
+
+        search_filter = IngredientsSearchFilter()
+        if search_filter.get_name(request):
+            return Response(search_filter.search(request))
+        return super().list(request, *args, **kwargs)
 
-class RecipeViewSet(viewsets.ModelViewSet):
+
+class RecipeViewSet(CursorPaginationMixin, ConditionalGetMixin,
+                    SerializerTimingMixin, viewsets.ModelViewSet):
 
     """Вьюсет рецептов."""
 
@@ -69,11 +104,14 @@ class RecipeViewSet(viewsets.ModelViewSet):
         'favorite': FavoriteSerializer,
         'get_link': ShortLinkSerializer,
         'shopping_cart': ShoppingCartSerializer,
+        'bulk_favorite': RecipeIdsSerializer,
+        'bulk_shopping_cart': RecipeIdsSerializer,
     }
     model = Recipe
     queryset = Recipe.objects.all()
     permission_classes = (IsOwnerOrReadOnly,)
     pagination_class = FoodgramPaginator
+    cursor_pagination_class = RecipeCursorPaginator
     filter_backends = (
         DjangoFilterBackend,)
     filterset_class = RecipesSearchFilter
@@ -82,6 +120,71 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         return self.serializer_classes.get(self.action)
 
+    def get_queryset(self):
+
+        """
+        Аннотированный queryset для list/retrieve.
+        Флаги избранного, корзины и подписки вычисляются подзапросами
+        Exists(), теги и ингредиенты подгружаются через Prefetch, поэтому
+        число запросов на страницу не зависит от её размера.
+        """
+
+        if self.action not in ('list', 'retrieve'):
+            return super().get_queryset()
+        user = self.request.user
+        queryset = Recipe.objects.select_related('author').only(
+            'id', 'name', 'image', 'image_thumbnails_ready', 'text',
+            'cooking_time', 'published', 'author__id', 'author__email',
+            'author__username', 'author__first_name', 'author__last_name',
+            'author__avatar', 'author__avatar_thumbnails_ready',
+        ).prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.only('id', 'name', 'slug')),
+            Prefetch('ingredients_in_recipe',
+                     queryset=IngredientInRecipe.objects.select_related(
+                         'ingredient').only('id', 'recipe_id', 'amount',
+                                            'ingredient__id',
+                                            'ingredient__name',
+                                            'ingredient__measurement_unit')),
+        )
+        if user.is_anonymous:
+            false_value = Value(False, output_field=BooleanField())
+            return queryset.annotate(is_favorited=false_value,
+                                     is_in_shopping_cart=false_value,
+                                     is_author_subscribed=false_value)
+        return queryset.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_author_subscribed=Exists(Following.objects.filter(
+                user=user, following=OuterRef('author'))),
+        )
+
+    def get_conditional_state(self):
+
+        """
+        Для рецепта - дата изменения: ее обновляют и изменения автора,
+        тегов и ингредиентов. Для ленты - версия таблицы рецептов, которую
+        сбрасывают сигналы тех же изменений: ETag строится без запросов
+        к ленте, Last-Modified не отдается. Порядок по популярности
+        зависит еще и от версии избранного.
+        """
+
+        if self.action == 'retrieve':
+            try:
+                updated_at = Recipe.objects.filter(
+                    pk=self.kwargs['pk']
+                ).values_list('updated_at', flat=True).first()
+            except (TypeError, ValueError):
+                return None
+            if updated_at is None:
+                return None
+            return updated_at, updated_at
+        version = [get_response_version('recipes')]
+        if self.request.query_params.get('ordering') == POPULAR_ORDERING:
+            version.append(get_response_version('favorites'))
+        return version, None
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -102,20 +205,31 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def post_delete_recipes_for_fav_and_shop_cart(self, request, pk, Model):
+
+        """
+        Добавление/удаление одного рецепта.
+        Проверки выполняются до транзакции, а транзакция начинается
+        с записи: в SQLite транзакция, начатая с чтения, получает
+        "database is locked" при параллельной записи.
+        """
+
         instance = self.get_object()
         if not instance:
             return Response(status=status.HTTP_404_NOT_FOUND)
         if request.method == 'DELETE':
-            obj = Model.objects.filter(recipe=instance.id,
-                                       user=request.user.id)
-            if obj.exists():
-                obj.delete()
+            with transaction.atomic():
+                removed = self.delete_user_recipes(Model, request.user.id,
+                                                   [instance.id])
+                self.apply_user_recipes_change(Model, request.user.id,
+                                               removed, -1)
+            if removed:
                 return Response(status=status.HTTP_204_NO_CONTENT)
             return Response(status=status.HTTP_400_BAD_REQUEST)
         serializer = self.get_serializer(data={'user': request.user.id,
                                                'recipe': instance.id})
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @decorators.action(
@@ -143,22 +257,173 @@ class RecipeViewSet(viewsets.ModelViewSet):
             request, pk, ShoppingCart
         )
 
+    @staticmethod
+    def change_user_recipes(sql, Model, params):
+
+        """
+        INSERT/DELETE строк избранного или корзины с RETURNING recipe_id:
+        счетчики и список покупок меняются только для строк, которые
+        действительно вставлены или удалены этим запросом.
+        """
+
+        with connections[Model.objects.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            return {row[0] for row in cursor.fetchall()}
+
+    @staticmethod
+    def apply_user_recipes_change(Model, user_id, recipe_ids, sign):
+
+        """
+        Изменения, которые при вставке/удалении через SQL не выполняют
+        сигналы: версия состояния пользователя, список покупок
+        и счетчик избранного.
+        """
+
+        if not recipe_ids:
+            return
+        bump_state_version(user_id)
+        if Model is ShoppingCart:
+            update_shopping_list(user_id, recipe_ids, sign=sign)
+        if Model is Favorite:
+            change_favorites_count(recipe_ids, sign)
+            bump_response_version_on_commit('favorites')
+
+    def insert_user_recipes(self, Model, user_id, recipe_ids):
+        values = ', '.join(['(%s, %s)'] * len(recipe_ids))
+        return self.change_user_recipes(
+            f'INSERT INTO {Model._meta.db_table} (user_id, recipe_id) '
+            f'VALUES {values} ON CONFLICT DO NOTHING RETURNING recipe_id',
+            Model,
+            [value for recipe_id in recipe_ids
+             for value in (user_id, recipe_id)]
+        )
+
+    def delete_user_recipes(self, Model, user_id, recipe_ids):
+        placeholders = ', '.join(['%s'] * len(recipe_ids))
+        return self.change_user_recipes(
+            f'DELETE FROM {Model._meta.db_table} WHERE user_id = %s '
+            f'AND recipe_id IN ({placeholders}) RETURNING recipe_id',
+            Model, [user_id, *recipe_ids]
+        )
+
+    def bulk_change_fav_and_shop_cart(self, request, Model):
+
+        """
+        Пакетное добавление(POST)/удаление(DELETE) рецептов.
+        Одна вставка или одно удаление с RETURNING: сигналы при этом
+        не вызываются, поэтому список покупок, счетчик избранного
+        и версия состояния пользователя обновляются здесь же.
+        Чтения выполняются до транзакции, транзакция начинается с записи.
+        """
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        user = request.user
+        if request.method == 'DELETE':
+            with transaction.atomic():
+                removed = self.delete_user_recipes(Model, user.id, recipe_ids)
+                self.apply_user_recipes_change(Model, user.id, removed, -1)
+            results = [
+                {'id': recipe_id,
+                 'status': 'removed' if recipe_id in removed else 'absent'}
+                for recipe_id in recipe_ids
+            ]
+            return Response({'results': results}, status=status.HTTP_200_OK)
+        existing = [recipe_id for recipe_id in Recipe.objects.filter(
+            id__in=recipe_ids
+        ).values_list('id', flat=True)]
+        added = set()
+        if existing:
+            with transaction.atomic():
+                added = self.insert_user_recipes(Model, user.id, existing)
+                self.apply_user_recipes_change(Model, user.id, added, 1)
+        existing = set(existing)
+        results = []
+        for recipe_id in recipe_ids:
+            if recipe_id not in existing:
+                result = 'not_found'
+            elif recipe_id in added:
+                result = 'added'
+            else:
+                result = 'exists'
+            results.append({'id': recipe_id, 'status': result})
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+    @decorators.action(
+        detail=False,
+        methods=('POST', 'DELETE'),
+        permission_classes=[IsAuthenticated],
+        url_path='favorite',
+        url_name='bulk-favorite')
+    def bulk_favorite(self, request):
+
+        """Пакетная работа с избранным."""
+
+        return self.bulk_change_fav_and_shop_cart(request, Favorite)
+
+    @decorators.action(
+        detail=False,
+        methods=('POST', 'DELETE'),
+        permission_classes=[IsAuthenticated],
+        url_path='shopping_cart',
+        url_name='bulk-shopping-cart')
+    def bulk_shopping_cart(self, request):
+
+        """Пакетная работа с корзиной."""
+
+        return self.bulk_change_fav_and_shop_cart(request, ShoppingCart)
+
     @decorators.action(
         detail=False,
         methods=('GET',),
         permission_classes=[IsAuthenticated],
+        renderer_classes=[PDFShoppingListRenderer, TextShoppingListRenderer,
+                          CSVShoppingListRenderer, JSONShoppingListRenderer],
         url_path='download_shopping_cart')
     def download_shopping_cart(self, request):
 
-        """Скачивание списка покупок."""
+        """
+        Скачивание списка покупок.
+        Формат выбирается параметром format (pdf, txt, csv, json) или
+        заголовком Accept, по умолчанию - pdf. Текстовые форматы
+        отдаются потоком без ReportLab. PDF кэшируется по содержимому
+        списка; при промахе кэша он формируется в запросе. С параметром
+        async=1 возвращается 202, а файл формируется в пуле процессов -
+        тот же адрес нужно запросить повторно.
+        """
 
         current_user = self.request.user
-        queryset = ShoppingCart.objects.filter(
-            user=current_user).values(
-                'recipe__ingredients__name',
-                'recipe__ingredients__measurement_unit').annotate(
-                total=Sum('recipe__ingredients_in_recipe__amount'))
-        buffer = io.BytesIO()
-        return FileResponse(create_pdf_template(buffer, queryset,
-                            current_user.username), as_attachment=True,
-                            filename="shopping_cart.pdf")
+        queryset = ShoppingListItem.objects.filter(
+            user=current_user).values_list(
+                'ingredient__name',
+                'ingredient__measurement_unit',
+                'total_amount').order_by('ingredient__name')
+        file_format = request.accepted_renderer.format
+        if file_format in SHOPPING_LIST_STREAMS:
+            stream, content_type = SHOPPING_LIST_STREAMS[file_format]
+            response = StreamingHttpResponse(
+                stream(queryset.iterator()), content_type=content_type
+            )
+        else:
+            rows = list(queryset.values('ingredient__name',
+                                        'ingredient__measurement_unit',
+                                        'total_amount'))
+            key = get_pdf_cache_key(current_user.username, rows)
+            if (request.query_params.get('async') == QUERY_PARAM[1]
+                    and get_pdf_cache().get(key) is None
+                    and submit_pdf_rendering(key, rows,
+                                             current_user.username)):
+                poll_url = request.build_absolute_uri()
+                return Response({'status': 'pending', 'url': poll_url},
+                                status=status.HTTP_202_ACCEPTED,
+                                headers={'Location': poll_url},
+                                content_type='application/json')
+            response = render_pdf_response(
+                HttpResponse(content_type='application/pdf'),
+                key, rows, current_user.username
+            )
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_cart.{file_format}"'
+        )
+        return response
@@ -0,0 +1,117 @@
+import gzip
+import hashlib
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import quote_etag
+
+from foodgram_backend.constants import RESPONSE_CACHE_MAX_AGE
+
+CACHED_FORMATS = ('json',)
+GZIP_RE = re.compile(r'\bgzip\b')
+
+
+def get_response_cache():
+    return caches[settings.RESPONSE_CACHE]
+
+
+def get_version_key(namespace):
+    return f'response_version:{namespace}'
+
+
+def get_response_version(namespace):
+
+    """
+    Текущая версия ответов пространства имен. Начальное значение -
+    время в наносекундах, чтобы после очистки кэша версия не повторилась.
+    """
+
+    return get_response_cache().get_or_set(get_version_key(namespace),
+                                           time.time_ns, timeout=None)
+
+
+def bump_response_version(namespace):
+
+    """Смена версии: все сохраненные ответы перестают использоваться."""
+
+    cache = get_response_cache()
+    try:
+        cache.incr(get_version_key(namespace))
+    except ValueError:
+        cache.set(get_version_key(namespace), time.time_ns(), timeout=None)
+
+
+def bump_response_version_on_commit(namespace):
+
+    """
+    Смена версии после коммита, чтобы запрос, прочитавший
+    еще старые данные, не сохранил их под новой версией.
+    """
+
+    transaction.on_commit(lambda: bump_response_version(namespace))
+
+
+class CachedResponseMixin:
+
+    """
+    Кэширование готовых ответов list и retrieve целиком.
+    Тело хранится в исходном виде и сжатым gzip, ключ включает версию,
+    которую сбрасывают сигналы изменения моделей, поэтому при попадании
+    не выполняются ни запросы к БД, ни сериализация.
+    """
+
+    response_cache_namespace = None
+
+    def get_cache_key(self, request, version):
+        digest = hashlib.sha1(request.get_full_path().encode()).hexdigest()
+        return (f'response:{self.response_cache_namespace}:{version}:'
+                f'{request.accepted_renderer.format}:{digest}')
+
+    def render_for_cache(self, response):
+        response.accepted_renderer = self.request.accepted_renderer
+        response.accepted_media_type = self.request.accepted_media_type
+        response.renderer_context = self.get_renderer_context()
+        response.render()
+        body = response.content
+        return body, gzip.compress(body, mtime=0), response['Content-Type']
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.accepted_renderer.format not in CACHED_FORMATS:
+            return handler(request, *args, **kwargs)
+        version = get_response_version(self.response_cache_namespace)
+        key = self.get_cache_key(request, version)
+        etag = quote_etag(hashlib.md5(key.encode()).hexdigest())
+        response = get_conditional_response(request._request, etag=etag)
+        if response is None:
+            cache = get_response_cache()
+            entry = cache.get(key)
+            if entry is None:
+                response = handler(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                entry = self.render_for_cache(response)
+                cache.set(key, entry)
+            body, compressed, content_type = entry
+            if GZIP_RE.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+                response = HttpResponse(compressed, content_type=content_type)
+                response['Content-Encoding'] = 'gzip'
+            else:
+                response = HttpResponse(body, content_type=content_type)
+        response['ETag'] = etag
+        patch_cache_control(response, public=True,
+                            max_age=RESPONSE_CACHE_MAX_AGE)
+        patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request,
+                                    *args, **kwargs)
@@ -0,0 +1,151 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from api.images import derivatives_ready, submit_derivatives
+from api.recipes.short_links import short_link_resolver
+from api.response_cache import (bump_response_version,
+                                bump_response_version_on_commit)
+from foodgram_backend.constants import AVATAR_IMAGE_SIZES, RECIPE_IMAGE_SIZES
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe,
+                            Recipe, ShortLink, Tag)
+from users.models import NewUser
+from users.signals import AUTHOR_FIELDS
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+
+    """
+    Сброс кэша ответов и индексов ингредиентов при их изменении.
+    Версия меняется после коммита, чтобы индекс не перестроился
+    по еще не закоммиченным данным.
+    """
+
+    bump_response_version_on_commit('ingredients')
+    bump_response_version_on_commit('recipes')
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_responses(sender, **kwargs):
+
+    """Сброс кэша ответов тегов при их изменении."""
+
+    bump_response_version('tags')
+    bump_response_version_on_commit('recipes')
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=IngredientInRecipe)
+@receiver(post_delete, sender=IngredientInRecipe)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_feed(sender, **kwargs):
+
+    """Сброс версии ленты при изменении рецептов, их ингредиентов и тегов."""
+
+    if not kwargs.get('raw'):
+        bump_response_version_on_commit('recipes')
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def invalidate_popular_feed(sender, raw=False, **kwargs):
+
+    """Избранное меняет порядок ленты по популярности."""
+
+    if not raw:
+        bump_response_version_on_commit('favorites')
+
+
+@receiver(post_save, sender=NewUser)
+def invalidate_author_recipes(sender, instance, created, update_fields, raw,
+                              **kwargs):
+
+    """Данные автора входят в ленту, вход пользователя ее не меняет."""
+
+    if created or raw:
+        return
+    if update_fields is not None and not AUTHOR_FIELDS & set(update_fields):
+        return
+    bump_response_version_on_commit('recipes')
+
+
+@receiver(post_delete, sender=ShortLink)
+def invalidate_short_link(sender, instance, **kwargs):
+
+    """
+    Сброс кэша короткой ссылки при ее удалении: коды не меняются.
+    Ссылки удаляются каскадно вместе с рецептом, поэтому сигнал
+    срабатывает и при удалении рецепта.
+    """
+
+    if instance.short_code_path:
+        short_link_resolver.invalidate(instance.short_code_path)
+
+
+def touch_recipes(recipes):
+    recipes.update(updated_at=timezone.now())
+    bump_response_version('recipes')
+
+
+def mark_derivatives_ready(owner, field_name, name, recipes):
+
+    """
+    Отметка о готовых копиях, если изображение с тех пор не сменилось.
+    Ссылки на копии входят в ответ с рецептом, поэтому обновляется
+    и дата изменения связанных рецептов (для ETag).
+    """
+
+    owner.filter(**{field_name: name}).update(
+        **{f'{field_name}_thumbnails_ready': True}
+    )
+    touch_recipes(recipes)
+
+
+def schedule_derivatives(instance, field_name, sizes, update_fields, raw,
+                         recipes):
+
+    """
+    Проверка копий при сохранении изображения: готовность записывается
+    в поле <field_name>_thumbnails_ready, отсутствующие копии создаются
+    после коммита.
+    """
+
+    image = getattr(instance, field_name)
+    if raw or not image:
+        return
+    if update_fields is not None and field_name not in update_fields:
+        return
+    name = image.name
+    ready_field = f'{field_name}_thumbnails_ready'
+    ready = derivatives_ready(name, sizes)
+    owner = type(instance).objects.filter(pk=instance.pk)
+    if ready != getattr(instance, ready_field):
+        owner.update(**{ready_field: ready})
+        setattr(instance, ready_field, ready)
+    if ready:
+        return
+    transaction.on_commit(lambda: submit_derivatives(
+        name, sizes,
+        lambda: mark_derivatives_ready(owner, field_name, name, recipes)
+    ))
+
+
+@receiver(post_save, sender=Recipe)
+def build_recipe_image_derivatives(sender, instance, update_fields, raw,
+                                   **kwargs):
+    schedule_derivatives(instance, 'image', RECIPE_IMAGE_SIZES,
+                         update_fields, raw,
+                         Recipe.objects.filter(id=instance.id))
+
+
+@receiver(post_save, sender=NewUser)
+def build_avatar_derivatives(sender, instance, update_fields, raw,
+                             **kwargs):
+    schedule_derivatives(instance, 'avatar', AVATAR_IMAGE_SIZES,
+                         update_fields, raw,
+                         Recipe.objects.filter(author_id=instance.id))
@@ -0,0 +1,61 @@
+import datetime
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+from users.models import NewUser
+
+
+class RecipeCursorPaginationTest(TestCase):
+
+    """Обход ленты рецептов по курсору."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = NewUser.objects.create_user(
+            username='author', email='author@example.com', password='pass'
+        )
+        published = timezone.now().replace(microsecond=500000)
+        recipes = Recipe.objects.bulk_create(
+            Recipe(author=cls.author, name=f'Рецепт {index}', text='Текст',
+                   cooking_time=1)
+            for index in range(10)
+        )
+        # Рецепты опубликованы в одну миллисекунду, часть - одновременно
+        for index, recipe in enumerate(recipes):
+            Recipe.objects.filter(pk=recipe.pk).update(
+                published=published + datetime.timedelta(
+                    microseconds=index // 2
+                )
+            )
+
+    def walk(self, url):
+        client = APIClient()
+        ids = []
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(recipe['id'] for recipe in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_all_pages_cover_feed(self):
+        expected = list(Recipe.objects.order_by(
+            '-published', '-id'
+        ).values_list('id', flat=True))
+        for limit in (1, 3, 4):
+            with self.subTest(limit=limit):
+                self.assertEqual(
+                    self.walk(f'/api/recipes/?cursor=&limit={limit}'),
+                    expected
+                )
+
+    def test_cursor_rejects_other_order(self):
+        client = APIClient()
+        for query in ('search=Рецепт', 'ordering=popular'):
+            with self.subTest(query=query):
+                response = client.get(f'/api/recipes/?cursor=&{query}')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('cursor', response.data)
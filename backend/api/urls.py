@@ -2,6 +2,7 @@ from django.urls import include, path, re_path
 from djoser.views import TokenCreateView, TokenDestroyView
 from rest_framework.routers import DefaultRouter
 
+from api.metrics import RequestMetricsView
 from api.recipes.views import IngredientViewSet, RecipeViewSet, TagViewSet
 from api.users.views import NewUserViewSet
 
@@ -18,4 +19,5 @@ urlpatterns = [
             name='login'),
     re_path(r'^auth/token/logout/?$', TokenDestroyView.as_view(),
             name='logout'),
+    path('metrics/', RequestMetricsView.as_view(), name='metrics'),
 ]
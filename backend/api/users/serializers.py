@@ -2,7 +2,8 @@ from djoser.serializers import SetPasswordSerializer, UserCreateSerializer
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
-from api.fields import Base64ImageField
+from api.fields import Base64ImageField, ImageDerivativesField
+from foodgram_backend.constants import AVATAR_IMAGE_SIZES, RECIPE_IMAGE_SIZES
 from recipes.models import Recipe
 from users.models import Following, NewUser
 
@@ -12,16 +13,21 @@ class NewUserGetSerializer(serializers.ModelSerializer):
     """Сериализатор получения данных пользователя."""
 
     is_subscribed = serializers.SerializerMethodField(default=False)
+    avatar_thumbnails = ImageDerivativesField('avatar',
+                                              sizes=AVATAR_IMAGE_SIZES)
 
     class Meta:
         fields = ('email', 'username', 'first_name',
-                  'last_name', 'id', 'is_subscribed', 'avatar')
+                  'last_name', 'id', 'is_subscribed', 'avatar',
+                  'avatar_thumbnails')
         model = NewUser
 
     def get_is_subscribed(self, obj):
 
         """Метод проверки подписки на автора."""
 
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         if request:
             if not request.user.is_anonymous:
@@ -33,10 +39,20 @@ class ShortRecipeGetSerializer(serializers.ModelSerializer):
 
     """Сериализатор короткого отображения рецепта."""
 
+    image_thumbnails = ImageDerivativesField('image',
+                                             sizes=RECIPE_IMAGE_SIZES)
+
     class Meta:
 
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time',)
+        fields = ('id', 'name', 'image', 'image_thumbnails', 'cooking_time',)
+
+
+class RecipesLimitSerializer(serializers.Serializer):
+
+    """Проверка параметра recipes_limit в запросе."""
+
+    recipes_limit = serializers.IntegerField(min_value=0, required=False)
 
 
 class NewUserWithRecipeGetSerializer(NewUserGetSerializer):
@@ -46,29 +62,30 @@ class NewUserWithRecipeGetSerializer(NewUserGetSerializer):
     Используется в to_representation() в FollowingSerializer.
     """
 
-    recipes_count = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
 
     class Meta:
         model = NewUser
         fields = ('email', 'username', 'first_name', 'last_name',
-                  'id', 'is_subscribed', 'avatar', 'recipes', 'recipes_count')
-
-    def get_recipes_count(self, obj):
-
-        """Подсчет рецептов автора."""
-
-        return obj.recipes.all().count()
+                  'id', 'is_subscribed', 'avatar', 'avatar_thumbnails',
+                  'recipes', 'recipes_count')
 
     def get_recipes(self, obj):
 
         """Метод для указания количества рецептов через recipes_limit."""
 
-        query_params_dict = self.context.get('request').query_params
+        if hasattr(obj, 'recipes_preview'):
+            recipes = obj.recipes_preview
+            return ShortRecipeGetSerializer(recipes, read_only=True,
+                                            many=True).data
+        limit_serializer = RecipesLimitSerializer(
+            data=self.context.get('request').query_params
+        )
+        limit_serializer.is_valid(raise_exception=True)
         recipes = obj.recipes.all()
-        if 'recipes_limit' in query_params_dict:
-            recipes_limit_value = int(query_params_dict.get('recipes_limit'))
-            recipes = recipes[:recipes_limit_value]
+        recipes_limit = limit_serializer.validated_data.get('recipes_limit')
+        if recipes_limit is not None:
+            recipes = recipes[:recipes_limit]
 
         serializer = ShortRecipeGetSerializer(recipes, read_only=True,
                                               many=True)
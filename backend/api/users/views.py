@@ -1,16 +1,26 @@
+from collections import defaultdict
+
+from django.db.models import BooleanField, F, Value
+from django.db.models.expressions import RawSQL
 from djoser.serializers import SetPasswordSerializer
 from rest_framework import decorators, status, viewsets
 from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
-from api.paginators import FoodgramPaginator
+from api.metrics import SerializerTimingMixin
+from api.paginators import (CursorPaginationMixin, FoodgramPaginator,
+                            SubscriptionCursorPaginator)
 from api.users.serializers import (AvatarSerializer, FollowingSerializer,
                                    NewUserCreateSerializer,
-                                   NewUserGetSerializer)
+                                   NewUserGetSerializer,
+                                   NewUserWithRecipeGetSerializer,
+                                   RecipesLimitSerializer)
+from recipes.models import Recipe
 from users.models import Following, NewUser
 
 
-class NewUserViewSet(viewsets.ModelViewSet):
+class NewUserViewSet(CursorPaginationMixin, SerializerTimingMixin,
+                     viewsets.ModelViewSet):
 
     """Вьюсет для работы с пользователем."""
 
@@ -22,12 +32,13 @@ class NewUserViewSet(viewsets.ModelViewSet):
         'create': NewUserCreateSerializer,
         'me': NewUserGetSerializer,
         'set_or_delete_avatar': AvatarSerializer,
-        'subscriptions': FollowingSerializer,
+        'subscriptions': NewUserWithRecipeGetSerializer,
         'subscribe': FollowingSerializer,
     }
 
     serializer_class = NewUserGetSerializer
     pagination_class = FoodgramPaginator
+    cursor_pagination_class = SubscriptionCursorPaginator
 
     def get_permissions(self):
 
@@ -90,6 +101,57 @@ class NewUserViewSet(viewsets.ModelViewSet):
         serializer.save()
         return Response(status=status.HTTP_200_OK, data=serializer.data)
 
+    def get_subscriptions_queryset(self, request):
+
+        """
+        Авторы, на которых подписан пользователь.
+        Число рецептов хранится в счетчике автора, превью рецептов
+        добавляет add_recipes_previews после пагинации.
+        """
+
+        return NewUser.objects.filter(
+            following__user=request.user
+        ).annotate(
+            is_subscribed=Value(True, output_field=BooleanField()),
+            subscription_id=F('following__id'),
+        ).order_by('subscription_id')
+
+    def get_recipes_limit(self, request):
+        serializer = RecipesLimitSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data.get('recipes_limit')
+
+    def add_recipes_previews(self, authors, recipes_limit):
+
+        """
+        Превью рецептов для страницы авторов одним запросом.
+        С recipes_limit последние рецепты каждого автора отбирает
+        оконная функция ROW_NUMBER() с разбиением по автору.
+        """
+
+        authors = list(authors)
+        author_ids = [author.id for author in authors]
+        recipes = Recipe.objects.only(
+            'id', 'name', 'image', 'image_thumbnails_ready', 'cooking_time',
+            'published', 'author_id'
+        ).filter(author_id__in=author_ids)
+        if recipes_limit is not None and author_ids:
+            placeholders = ', '.join(['%s'] * len(author_ids))
+            recipes = recipes.filter(id__in=RawSQL(
+                'SELECT id FROM (SELECT id, ROW_NUMBER() OVER ('
+                'PARTITION BY author_id ORDER BY published DESC, id DESC'
+                f') AS position FROM {Recipe._meta.db_table} '
+                f'WHERE author_id IN ({placeholders})) AS ranked '
+                'WHERE position <= %s', [*author_ids, recipes_limit]
+            ))
+        previews = defaultdict(list)
+        if author_ids:
+            for recipe in recipes.order_by('-published', '-id'):
+                previews[recipe.author_id].append(recipe)
+        for author in authors:
+            author.recipes_preview = previews[author.id]
+        return authors
+
     @decorators.action(methods=['GET'], detail=False,
                        url_path='subscriptions',
                        )
@@ -97,9 +159,11 @@ class NewUserViewSet(viewsets.ModelViewSet):
 
         """Список подписок пользователя."""
 
-        user_obj = request.user
-        qs = user_obj.follower.all()
-        page = self.paginate_queryset(qs)
+        recipes_limit = self.get_recipes_limit(request)
+        page = self.add_recipes_previews(
+            self.paginate_queryset(self.get_subscriptions_queryset(request)),
+            recipes_limit
+        )
         serializer = self.get_serializer(page, many=True,
                                          context={'request': request})
         return self.get_paginated_response(serializer.data)
@@ -114,6 +178,7 @@ class NewUserViewSet(viewsets.ModelViewSet):
         author_recipes = self.get_object()
         current_user = request.user
         if request.method == 'POST':
+            self.get_recipes_limit(request)
             serializer = self.get_serializer(
                 data={'following': author_recipes.username},
                 context={'request': request})
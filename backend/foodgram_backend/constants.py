@@ -13,3 +13,69 @@ DEFAULT_PAGE_SIZE = 4
 # Константа для выбора параметра фильтра корзины и избранного
 
 QUERY_PARAM = ('0', '1',)
+
+# Значение параметра ordering для сортировки рецептов по популярности
+
+POPULAR_ORDERING = 'popular'
+
+# Константы кэша списка покупок в формате *.pdf
+
+PDF_CACHE_KEY_VERSION = 1
+PDF_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Сколько секунд считать фоновое формирование *.pdf незавершенным
+# и сколько помнить его ошибку (повторный запрос формирует PDF сразу)
+
+PDF_PENDING_TIMEOUT = 60
+PDF_FAILURE_TIMEOUT = 60
+
+# Число результатов поиска ингредиентов по умолчанию и максимальное
+
+INGREDIENT_SEARCH_LIMIT = 20
+INGREDIENT_SEARCH_MAX_LIMIT = 100
+
+# Размер LRU-кэша коротких ссылок и время жизни записей, секунды
+
+SHORT_LINK_CACHE_SIZE = 10000
+SHORT_LINK_CACHE_TIMEOUT = 60 * 60
+
+# Время жизни записи LRU коротких ссылок в памяти процесса, секунды:
+# за это время удаление рецепта доходит до остальных процессов
+
+SHORT_LINK_LOCAL_TIMEOUT = 60
+
+# Длина кода короткой ссылки (четная: половины кода переставляются отдельно)
+
+SHORT_CODE_LENGTH = 6
+
+# Ограничения загружаемых изображений: размер в байтах и стороны в пикселях
+
+IMAGE_MAX_SIZE = 10 * 1024 * 1024
+IMAGE_MAX_DIMENSION = 5000
+
+# Размеры уменьшенных копий изображений (по большей стороны), пиксели
+
+RECIPE_IMAGE_SIZES = (300, 800)
+AVATAR_IMAGE_SIZES = (100,)
+
+# Версия формата ответов в ETag: увеличивается при изменении сериализаторов
+
+CONDITIONAL_GET_VERSION = 1
+
+# Кэш готовых ответов тегов и ингредиентов: хранение и max-age, секунды
+
+RESPONSE_CACHE_TIMEOUT = 60 * 60 * 24
+RESPONSE_CACHE_MAX_AGE = 60 * 60
+
+# Максимальное число рецептов в одном запросе к избранному или корзине
+
+BULK_RECIPES_LIMIT = 100
+
+# С какого числа строк админка показывает оценку размера таблицы
+# из статистики PostgreSQL вместо COUNT(*)
+
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 10000
+
+# Число строк списков покупок в одном INSERT или UPDATE
+
+SHOPPING_LIST_BATCH_SIZE = 500
@@ -0,0 +1,26 @@
+class DenormalizedFieldsMixin:
+
+    """
+    Поля, которые меняются только запросами UPDATE с F() (счетчики,
+    версии), не записываются обычным save(): иначе устаревшее значение
+    из памяти затерло бы параллельные изменения.
+    save() существующей строки всегда идет с update_fields, поэтому:
+    - строка, удаленная параллельно, не вставляется заново, а save()
+      падает с DatabaseError "did not affect any rows";
+    - отложенные (defer/only) поля не записываются и не загружаются
+      лишним запросом.
+    """
+
+    denormalized_fields = ()
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if (update_fields is None and not args and not self._state.adding
+                and not kwargs.get('force_insert')):
+            deferred_fields = self.get_deferred_fields()
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.denormalized_fields
+                and field.attname not in deferred_fields
+            ]
+        super().save(*args, update_fields=update_fields, **kwargs)
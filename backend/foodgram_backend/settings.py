@@ -4,6 +4,10 @@ from pathlib import Path
 from django.core.management.utils import get_random_secret_key
 from dotenv import load_dotenv
 
+from foodgram_backend.constants import (PDF_CACHE_TIMEOUT,
+                                        RESPONSE_CACHE_TIMEOUT,
+                                        SHORT_LINK_CACHE_TIMEOUT)
+
 load_dotenv(override=True)
 
 
@@ -33,6 +37,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -43,6 +48,29 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Метрики запросов (Server-Timing, логи, /api/metrics/), по умолчанию выкл.
+
+REQUEST_METRICS_ENABLED = (
+    os.getenv('REQUEST_METRICS', '').lower() == 'true'
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.metrics': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 ROOT_URLCONF = 'foodgram_backend.urls'
 
 TEMPLATES = [
@@ -88,6 +116,56 @@ else:
         }
     }
 
+# Кэш: сформированные списки покупок в *.pdf, готовые ответы тегов
+# и ингредиентов и короткие ссылки хранятся на диске и общие
+# для всех процессов
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shopping_list_pdf': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('PDF_CACHE_DIR',
+                              str(BASE_DIR / 'pdf_cache')),
+        'TIMEOUT': PDF_CACHE_TIMEOUT,
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('RESPONSE_CACHE_DIR',
+                              str(BASE_DIR / 'response_cache')),
+        'TIMEOUT': RESPONSE_CACHE_TIMEOUT,
+    },
+    'short_links': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('SHORT_LINK_CACHE_DIR',
+                              str(BASE_DIR / 'short_link_cache')),
+        'TIMEOUT': SHORT_LINK_CACHE_TIMEOUT,
+    },
+}
+
+SHOPPING_LIST_PDF_CACHE = 'shopping_list_pdf'
+RESPONSE_CACHE = 'responses'
+
+# Общий для процессов кэш Django для коротких ссылок в дополнение к LRU
+# в памяти. None - без него: адреса удаленных рецептов тогда остаются
+# в LRU других процессов до SHORT_LINK_LOCAL_TIMEOUT
+
+SHORT_LINK_CACHE = os.getenv('SHORT_LINK_CACHE', 'short_links') or None
+
+# Ключ перестановки для кодов коротких ссылок. Не менять после запуска:
+# новые коды могут совпасть с уже выданными
+
+SHORT_LINK_KEY = os.getenv('SHORT_LINK_KEY', 'foodgram-short-links')
+
+# Число процессов для формирования *.pdf, 0 - формирование в запросе
+
+PDF_RENDER_WORKERS = int(os.getenv('PDF_RENDER_WORKERS', 2))
+
+# Число потоков для уменьшенных копий изображений, 0 - создание в запросе
+
+IMAGE_DERIVATIVE_WORKERS = int(os.getenv('IMAGE_DERIVATIVE_WORKERS', 2))
+
 # Кастомная модель пользователя
 
 AUTH_USER_MODEL = 'users.NewUser'
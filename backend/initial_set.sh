@@ -8,6 +8,9 @@ python manage.py check --database default
 echo "Применение миграций..."
 python manage.py migrate
 
+echo "Создаем недостающие уменьшенные копии изображений..."
+python manage.py build_image_derivatives
+
 echo "Собираем статику бэкенда..."
 python manage.py collectstatic --noinput
 
@@ -17,6 +20,7 @@ mkdir -p /backend_static/static/
 cp -r /app/collected_static/. /backend_static/static/
 
 echo "Загружаем дампы ингредиентов и тегов..."
-python manage.py loaddata data_ingr.json data_tags.json data_adm.json
+python manage.py import_ingredients recipes/fixtures/data_ingr.json
+python manage.py loaddata data_tags.json data_adm.json
 
 echo "Данные успешно загружены. Проект готов к работе!"
@@ -0,0 +1,74 @@
+from django.db.models import Count, F, OuterRef, PositiveIntegerField, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from recipes.models import Favorite, Recipe
+from users.models import Following, NewUser
+
+
+def change_counter(queryset, field, delta):
+
+    """
+    Атомарное изменение счетчика выражением F() в той же транзакции,
+    что и изменение связанных данных. Значение не опускается ниже нуля.
+    """
+
+    value = F(field) + delta if delta > 0 else Greatest(F(field) + delta, 0)
+    queryset.update(**{field: value})
+
+
+def change_favorites_count(recipe_ids, delta):
+    change_counter(Recipe.objects.filter(id__in=recipe_ids),
+                   'favorites_count', delta)
+
+
+def change_recipes_count(user_id, delta):
+    change_counter(NewUser.objects.filter(id=user_id), 'recipes_count', delta)
+
+
+def change_followers_count(user_id, delta):
+    change_counter(NewUser.objects.filter(id=user_id), 'followers_count',
+                   delta)
+
+
+def count_related(Model, field):
+
+    """Подзапрос: число строк Model, ссылающихся на текущую строку."""
+
+    return Coalesce(Subquery(
+        Model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total'),
+        output_field=PositiveIntegerField()
+    ), 0)
+
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (NewUser, 'recipes_count', Recipe, 'author'),
+    (NewUser, 'followers_count', Following, 'following'),
+)
+
+
+def get_counters_diff():
+
+    """
+    Расхождения счетчиков с фактическими данными:
+    список (модель, счетчик, id, в таблице, фактически).
+    """
+
+    diff = []
+    for Model, field, Related, related_field in COUNTERS:
+        rows = Model.objects.annotate(
+            actual=count_related(Related, related_field)
+        ).exclude(**{field: F('actual')}).values_list('id', field, 'actual')
+        diff.extend((Model.__name__, field, *row) for row in rows)
+    return diff
+
+
+def reconcile_counters():
+
+    """Пересчет всех счетчиков: по одному UPDATE на счетчик."""
+
+    for Model, field, Related, related_field in COUNTERS:
+        Model.objects.update(**{field: count_related(Related,
+                                                     related_field)})
@@ -0,0 +1,147 @@
+import csv
+import io
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.response_cache import bump_response_version
+from recipes.models import Ingredient
+
+BATCH_SIZE = 1000
+CHUNK_SIZE = 64 * 1024
+DEFAULT_PATH = settings.BASE_DIR.parent / 'data/ingredients.csv'
+POSTGRES_TEMP_TABLE = 'import_ingredients_tmp'
+
+
+def read_csv(file):
+
+    """Построчное чтение файла вида «название,единица»."""
+
+    for row in csv.reader(file):
+        if len(row) >= 2 and row[0].strip():
+            yield row[0].strip(), row[1].strip()
+
+
+def read_json(file):
+
+    """
+    Потоковое чтение JSON-массива: объекты разбираются по одному,
+    файл целиком в память не загружается. Поддерживаются как записи
+    {"name", "measurement_unit"}, так и фикстуры Django с ключом fields.
+    """
+
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n[,':
+            position += 1
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                if buffer[position:].strip():
+                    raise CommandError('Некорректный JSON-файл.')
+                return
+            chunk = file.read(CHUNK_SIZE)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        position = end
+        item = item.get('fields', item)
+        yield item['name'].strip(), item['measurement_unit'].strip()
+
+
+READERS = {
+    '.csv': read_csv,
+    '.json': read_json,
+}
+
+
+def get_batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def insert_batch(batch):
+
+    """Вставка пачки ингредиентов с пропуском уже существующих."""
+
+    if connection.vendor != 'postgresql':
+        Ingredient.objects.bulk_create(
+            (Ingredient(name=name, measurement_unit=measurement_unit)
+             for name, measurement_unit in batch),
+            ignore_conflicts=True
+        )
+        return
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(batch)
+    buffer.seek(0)
+    table = Ingredient._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TEMP TABLE IF NOT EXISTS {POSTGRES_TEMP_TABLE} '
+            '(name text, measurement_unit text)'
+        )
+        cursor.cursor.copy_expert(
+            f'COPY {POSTGRES_TEMP_TABLE} (name, measurement_unit) '
+            'FROM STDIN WITH (FORMAT csv)', buffer
+        )
+        cursor.execute(
+            f'INSERT INTO {table} (name, measurement_unit) '
+            f'SELECT name, measurement_unit FROM {POSTGRES_TEMP_TABLE} '
+            'ON CONFLICT (name, measurement_unit) DO NOTHING'
+        )
+        cursor.execute(f'TRUNCATE {POSTGRES_TEMP_TABLE}')
+
+
+class Command(BaseCommand):
+
+    """Потоковая загрузка справочника ингредиентов из CSV или JSON."""
+
+    help = ('Загружает ингредиенты пачками; уже существующие пары '
+            '(название, единица измерения) пропускаются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=str(DEFAULT_PATH),
+                            help='Файл *.csv или *.json.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        reader = READERS.get(path.suffix.lower())
+        if reader is None:
+            raise CommandError('Поддерживаются только файлы *.csv и *.json.')
+        if not path.exists():
+            raise CommandError(f'Файл {path} не найден.')
+        start = time.perf_counter()
+        count_before = Ingredient.objects.count()
+        total = 0
+        with open(path, encoding='utf-8') as file, transaction.atomic():
+            for batch in get_batches(reader(file), options['batch_size']):
+                insert_batch(batch)
+                total += len(batch)
+        created = Ingredient.objects.count() - count_before
+        if created:
+            # bulk_create и COPY не вызывают сигналы: смена версии
+            # сбрасывает кэш ответов и индексы ингредиентов всех процессов
+            bump_response_version('ingredients')
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Прочитано {total}, добавлено {created}, пропущено '
+            f'{total - created} ингредиентов за {elapsed:.2f} с '
+            f'({total / elapsed:.0f} строк/с).'
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from recipes.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+
+    """Перестроение полнотекстового индекса рецептов."""
+
+    help = 'Перестраивает полнотекстовый индекс рецептов.'
+
+    def handle(self, *args, **options):
+        rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS('Индекс рецептов перестроен.'))
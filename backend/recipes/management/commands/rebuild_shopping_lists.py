@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.shopping_list import (get_shopping_lists_diff,
+                                   rebuild_shopping_lists)
+
+
+class Command(BaseCommand):
+
+    """Проверка и перестроение таблицы списков покупок по корзинам."""
+
+    help = 'Перестраивает списки покупок пользователей по их корзинам.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только проверить расхождения, не изменяя данные.'
+        )
+
+    def handle(self, *args, **options):
+        diff = get_shopping_lists_diff()
+        for (user_id, ingredient_id), (actual, expected) in sorted(
+                diff.items()):
+            self.stdout.write(
+                f'user={user_id} ingredient={ingredient_id}: '
+                f'в таблице {actual}, по корзине {expected}'
+            )
+        if options['check']:
+            if diff:
+                raise CommandError(f'Найдено расхождений: {len(diff)}.')
+            self.stdout.write(self.style.SUCCESS('Расхождений нет.'))
+            return
+        rebuild_shopping_lists()
+        self.stdout.write(self.style.SUCCESS(
+            f'Списки покупок перестроены, исправлено позиций: {len(diff)}.'
+        ))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.response_cache import bump_response_version
+from recipes.counters import get_counters_diff, reconcile_counters
+
+
+class Command(BaseCommand):
+
+    """Проверка и пересчет счетчиков избранного, рецептов и подписчиков."""
+
+    help = ('Сверяет favorites_count, recipes_count и followers_count '
+            'с фактическими данными и исправляет расхождения.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только проверить расхождения, не изменяя данные.'
+        )
+
+    def handle(self, *args, **options):
+        diff = get_counters_diff()
+        for model, field, object_id, stored, actual in diff:
+            self.stdout.write(
+                f'{model} id={object_id} {field}: '
+                f'в таблице {stored}, фактически {actual}'
+            )
+        if options['check']:
+            if diff:
+                raise CommandError(f'Найдено расхождений: {len(diff)}.')
+            self.stdout.write(self.style.SUCCESS('Расхождений нет.'))
+            return
+        reconcile_counters()
+        bump_response_version('favorites')
+        self.stdout.write(self.style.SUCCESS(
+            f'Счетчики пересчитаны, исправлено значений: {len(diff)}.'
+        ))
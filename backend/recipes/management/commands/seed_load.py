@@ -0,0 +1,172 @@
+import io
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from PIL import Image
+
+from api.images import build_derivatives, derivatives_ready
+from foodgram_backend.constants import RECIPE_IMAGE_SIZES
+from recipes.counters import reconcile_counters
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingCart, ShortLink, Tag)
+from recipes.search import rebuild_search_index
+from recipes.shopping_list import rebuild_shopping_lists
+from recipes.short_codes import get_original_path, get_short_code
+from users.models import Following
+
+BATCH_SIZE = 1000
+SEED_IMAGE_NAME = 'recipes/seed.png'
+SEED_PASSWORD = 'seed-password'
+WORDS = ('суп', 'салат', 'пирог', 'запеканка', 'рагу', 'каша', 'омлет',
+         'паста', 'плов', 'борщ', 'блины', 'котлеты', 'соус', 'десерт')
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+
+    """Заполнение БД синтетическими данными для нагрузочных замеров."""
+
+    help = ('Создает пользователей, рецепты, избранное, корзины и подписки. '
+            'При одинаковом --seed на пустой БД данные совпадают.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--ingredients-per-recipe', type=int, nargs=2,
+                            default=(3, 15), metavar=('MIN', 'MAX'))
+        parser.add_argument('--tags-per-recipe', type=int, nargs=2,
+                            default=(1, 3), metavar=('MIN', 'MAX'))
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--cart-per-user', type=int, default=5)
+        parser.add_argument('--follows-per-user', type=int, default=10)
+        parser.add_argument('--prefix', default='seed')
+
+    def get_image_name(self):
+        if not default_storage.exists(SEED_IMAGE_NAME):
+            buffer = io.BytesIO()
+            Image.new('RGB', (300, 300), (230, 150, 60)).save(buffer, 'PNG')
+            default_storage.save(SEED_IMAGE_NAME,
+                                 ContentFile(buffer.getvalue()))
+        if not derivatives_ready(SEED_IMAGE_NAME, RECIPE_IMAGE_SIZES):
+            build_derivatives(SEED_IMAGE_NAME, RECIPE_IMAGE_SIZES)
+        return SEED_IMAGE_NAME
+
+    def create_users(self, rng, count, prefix):
+        start = User.objects.filter(username__startswith=prefix).count()
+        password = make_password(SEED_PASSWORD)
+        users = [
+            User(username=f'{prefix}_user_{number}',
+                 email=f'{prefix}_user_{number}@example.com',
+                 first_name=rng.choice(('Анна', 'Иван', 'Мария', 'Олег')),
+                 last_name=rng.choice(('Иванова', 'Петров', 'Смирнова')),
+                 password=password)
+            for number in range(start, start + count)
+        ]
+        User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+        return list(User.objects.filter(
+            username__in=[user.username for user in users]
+        ).order_by('id').values_list('id', flat=True))
+
+    def create_recipes(self, rng, count, user_ids, options):
+        image = self.get_image_name()
+        recipes = [
+            Recipe(author_id=rng.choice(user_ids),
+                   name=f'{rng.choice(WORDS).capitalize()} '
+                        f'{rng.choice(WORDS)} №{number}',
+                   text=' '.join(rng.choices(WORDS, k=rng.randint(10, 60))),
+                   cooking_time=rng.randint(5, 180),
+                   image=image,
+                   image_thumbnails_ready=True)
+            for number in range(count)
+        ]
+        Recipe.objects.bulk_create(recipes, batch_size=BATCH_SIZE)
+        recipe_ids = list(Recipe.objects.order_by('-id').values_list(
+            'id', flat=True)[:count])[::-1]
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        tag_ids = list(Tag.objects.values_list('id', flat=True))
+        ingredients = []
+        tags = []
+        for recipe_id in recipe_ids:
+            for ingredient_id in rng.sample(
+                    ingredient_ids,
+                    rng.randint(*options['ingredients_per_recipe'])):
+                ingredients.append(IngredientInRecipe(
+                    recipe_id=recipe_id, ingredient_id=ingredient_id,
+                    amount=rng.randint(1, 500)
+                ))
+            for tag_id in rng.sample(
+                    tag_ids, min(len(tag_ids),
+                                 rng.randint(*options['tags_per_recipe']))):
+                tags.append(Recipe.tags.through(recipe_id=recipe_id,
+                                                tag_id=tag_id))
+        IngredientInRecipe.objects.bulk_create(ingredients,
+                                               batch_size=BATCH_SIZE)
+        Recipe.tags.through.objects.bulk_create(tags, batch_size=BATCH_SIZE)
+        ShortLink.objects.bulk_create(
+            (ShortLink(recipe_id=recipe_id,
+                       short_code_path=get_short_code(recipe_id),
+                       original_path=get_original_path(recipe_id))
+             for recipe_id in recipe_ids),
+            batch_size=BATCH_SIZE
+        )
+        return recipe_ids
+
+    def create_relations(self, rng, user_ids, recipe_ids, options):
+        favorites = []
+        carts = []
+        follows = []
+        for user_id in user_ids:
+            for recipe_id in rng.sample(
+                    recipe_ids,
+                    min(options['favorites_per_user'], len(recipe_ids))):
+                favorites.append(Favorite(user_id=user_id,
+                                          recipe_id=recipe_id))
+            for recipe_id in rng.sample(
+                    recipe_ids,
+                    min(options['cart_per_user'], len(recipe_ids))):
+                carts.append(ShoppingCart(user_id=user_id,
+                                          recipe_id=recipe_id))
+            authors = [author for author in user_ids if author != user_id]
+            for author_id in rng.sample(
+                    authors,
+                    min(options['follows_per_user'], len(authors))):
+                follows.append(Following(user_id=user_id,
+                                         following_id=author_id))
+        Favorite.objects.bulk_create(favorites, batch_size=BATCH_SIZE)
+        ShoppingCart.objects.bulk_create(carts, batch_size=BATCH_SIZE)
+        Following.objects.bulk_create(follows, batch_size=BATCH_SIZE)
+        return len(favorites), len(carts), len(follows)
+
+    def handle(self, *args, **options):
+        if not Ingredient.objects.exists() or not Tag.objects.exists():
+            raise CommandError('Сначала загрузите ингредиенты и теги: '
+                               'import_ingredients, loaddata data_tags.json')
+        if options['users'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь.')
+        rng = random.Random(options['seed'])
+        start = time.perf_counter()
+        with transaction.atomic():
+            user_ids = self.create_users(rng, options['users'],
+                                         options['prefix'])
+            recipe_ids = self.create_recipes(rng, options['recipes'],
+                                             user_ids, options)
+            favorites, carts, follows = self.create_relations(
+                rng, user_ids, recipe_ids, options
+            )
+            rebuild_shopping_lists()
+            rebuild_search_index()
+            reconcile_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано за {time.perf_counter() - start:.1f} с: '
+            f'пользователей {len(user_ids)}, рецептов {len(recipe_ids)}, '
+            f'избранного {favorites}, корзин {carts}, подписок {follows}. '
+            f'Пароль пользователей: {SEED_PASSWORD}'
+        ))
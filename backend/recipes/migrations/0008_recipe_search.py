@@ -0,0 +1,73 @@
+from django.db import migrations
+
+# Копия логики на момент миграции: последующие изменения recipes.search
+# не должны менять ее поведение
+
+SQLITE_TABLE = 'recipes_recipe_fts'
+POSTGRES_TABLE = 'recipes_recipe_search'
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('russian', %s), 'A') || "
+    "setweight(to_tsvector('russian', %s), 'B')"
+)
+
+
+def normalize_text(value):
+    return value.replace('ё', 'е').replace('Ё', 'Е')
+
+
+def create_index(apps, schema_editor):
+
+    """
+    Создание полнотекстового индекса рецептов и его заполнение.
+    Таблица PostgreSQL без внешнего ключа: иначе TRUNCATE таблицы
+    рецептов (flush, TransactionTestCase) требовал бы CASCADE.
+    """
+
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE {SQLITE_TABLE} USING fts5('
+            "name, text, tokenize='unicode61 remove_diacritics 2')"
+        )
+        insert_sql = (f'INSERT INTO {SQLITE_TABLE} (rowid, name, text) '
+                      'VALUES (%s, %s, %s)')
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE TABLE {POSTGRES_TABLE} ('
+            'recipe_id bigint PRIMARY KEY, document tsvector NOT NULL)'
+        )
+        schema_editor.execute(
+            f'CREATE INDEX {POSTGRES_TABLE}_document_gin '
+            f'ON {POSTGRES_TABLE} USING gin (document)'
+        )
+        insert_sql = (f'INSERT INTO {POSTGRES_TABLE} (recipe_id, document) '
+                      f'VALUES (%s, {POSTGRES_DOCUMENT})')
+    else:
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT id, name, text FROM recipes_recipe')
+        recipes = cursor.fetchall()
+        cursor.executemany(
+            insert_sql,
+            [(recipe_id, normalize_text(name), normalize_text(text))
+             for recipe_id, name, text in recipes]
+        )
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SQLITE_TABLE}')
+    elif vendor == 'postgresql':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {POSTGRES_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_shoppinglistitem'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
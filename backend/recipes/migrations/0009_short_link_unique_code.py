@@ -0,0 +1,93 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:13
+
+import hashlib
+import hmac
+import string
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Копия recipes.short_codes на момент миграции: последующие изменения
+# модуля не должны менять коды, выданные этой миграцией
+
+ALPHABET = string.digits + string.ascii_lowercase + string.ascii_uppercase
+SHORT_CODE_LENGTH = 6
+HALF_SIZE = len(ALPHABET) ** (SHORT_CODE_LENGTH // 2)
+FEISTEL_ROUNDS = 4
+
+
+def permute(number):
+    left, right = divmod(number, HALF_SIZE)
+    for round_number in range(FEISTEL_ROUNDS):
+        digest = hmac.new(settings.SHORT_LINK_KEY.encode(),
+                          f'{round_number}:{right}'.encode(),
+                          hashlib.sha256).digest()
+        left, right = right, (
+            left + int.from_bytes(digest[:8], 'big') % HALF_SIZE
+        ) % HALF_SIZE
+    return left * HALF_SIZE + right
+
+
+def get_short_code(recipe_id):
+    number = permute(recipe_id)
+    code = []
+    for _ in range(SHORT_CODE_LENGTH):
+        number, digit = divmod(number, len(ALPHABET))
+        code.append(ALPHABET[digit])
+    return ''.join(reversed(code))
+
+
+def get_original_path(recipe_id):
+    return f'/recipes/{recipe_id}'
+
+
+def assign_short_codes(apps, schema_editor):
+
+    """
+    Новые коды для ссылок с пустым или повторяющимся кодом и ссылки
+    для рецептов без них. Уникальные старые коды сохраняются.
+    """
+
+    ShortLink = apps.get_model('recipes', 'ShortLink')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    seen_codes = set()
+    for short_link in ShortLink.objects.order_by('id'):
+        code = short_link.short_code_path
+        if code and code not in seen_codes:
+            seen_codes.add(code)
+            continue
+        if short_link.recipe_id is None:
+            short_link.delete()
+            continue
+        short_link.short_code_path = get_short_code(short_link.recipe_id)
+        short_link.save(update_fields=['short_code_path'])
+        seen_codes.add(short_link.short_code_path)
+    ShortLink.objects.bulk_create(
+        (ShortLink(recipe_id=recipe_id,
+                   short_code_path=get_short_code(recipe_id),
+                   original_path=get_original_path(recipe_id))
+         for recipe_id in Recipe.objects.filter(
+             short_code_path__isnull=True).values_list('id', flat=True)),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_search'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='shortlink',
+            name='short_code_path',
+            field=models.CharField(max_length=6, blank=True, verbose_name='код для короткой ссылки'),
+        ),
+        migrations.RunPython(assign_short_codes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='shortlink',
+            name='short_code_path',
+            field=models.CharField(max_length=6, unique=True, verbose_name='код для короткой ссылки'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_short_link_unique_code'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-published', '-id'], name='recipe_published_id_idx'),
+        ),
+    ]
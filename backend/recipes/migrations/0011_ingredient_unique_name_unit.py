@@ -0,0 +1,56 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:20
+
+from django.db import migrations, models
+
+
+def merge_references(Model, owner_field, keep_id, duplicate_id, amount_field):
+    for row in Model.objects.filter(ingredient_id=duplicate_id):
+        kept = Model.objects.filter(
+            ingredient_id=keep_id,
+            **{owner_field: getattr(row, owner_field)}
+        ).first()
+        if kept is None:
+            row.ingredient_id = keep_id
+            row.save(update_fields=['ingredient'])
+            continue
+        setattr(kept, amount_field,
+                getattr(kept, amount_field) + getattr(row, amount_field))
+        kept.save(update_fields=[amount_field])
+        row.delete()
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientInRecipe = apps.get_model('recipes', 'IngredientInRecipe')
+    ShoppingListItem = apps.get_model('recipes', 'ShoppingListItem')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(
+        keep_id=models.Min('id'), total=models.Count('id')
+    ).filter(total__gt=1).order_by()
+    for group in duplicates:
+        duplicate_ids = Ingredient.objects.filter(
+            name=group['name'], measurement_unit=group['measurement_unit']
+        ).exclude(id=group['keep_id']).values_list('id', flat=True)
+        for duplicate_id in list(duplicate_ids):
+            merge_references(IngredientInRecipe, 'recipe_id',
+                             group['keep_id'], duplicate_id, 'amount')
+            merge_references(ShoppingListItem, 'user_id',
+                             group['keep_id'], duplicate_id, 'total_amount')
+            Ingredient.objects.filter(id=duplicate_id).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipe_published_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_ingredients,
+                             migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='recipes _ ingredient _unique_name_unit'),
+        ),
+    ]
@@ -3,7 +3,9 @@ from django.core.validators import MinValueValidator, RegexValidator
 from django.db import models
 
 from foodgram_backend.constants import (LEN_LIMIT, MIN_VALUE_AMOUNT,
-                                        MIN_VALUE_COOK_TIME)
+                                        MIN_VALUE_COOK_TIME,
+                                        SHORT_CODE_LENGTH)
+from foodgram_backend.mixins import DenormalizedFieldsMixin
 
 
 class Ingredient(models.Model):
@@ -17,6 +19,12 @@ class Ingredient(models.Model):
 
     class Meta:
         ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='%(app_label)s _ %(class)s _unique_name_unit',
+            )
+        ]
         verbose_name = 'ингредиент'
         verbose_name_plural = 'Ингредиенты'
 
@@ -43,10 +51,12 @@ class Tag(models.Model):
         return f'{self.name}'[:LEN_LIMIT]
 
 
-class Recipe(models.Model):
+class Recipe(DenormalizedFieldsMixin, models.Model):
 
     """Модель рецепта."""
 
+    denormalized_fields = ('favorites_count', 'image_thumbnails_ready')
+
     author = models.ForeignKey(settings.AUTH_USER_MODEL,
                                on_delete=models.CASCADE,
                                related_name='recipes',
@@ -56,6 +66,10 @@ class Recipe(models.Model):
     image = models.ImageField(upload_to='recipes/', null=True,
                               default=None,
                               verbose_name='Изображение')
+    image_thumbnails_ready = models.BooleanField(
+        default=False, editable=False,
+        verbose_name='Уменьшенные копии изображения созданы'
+    )
     text = models.TextField(verbose_name='Описание')
     ingredients = models.ManyToManyField(Ingredient,
                                          through='IngredientInRecipe',
@@ -71,9 +85,23 @@ class Recipe(models.Model):
         null=True,
         blank=True
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0, editable=False,
+        verbose_name='Число добавлений в избранное'
+    )
 
     class Meta:
         ordering = ['-published']
+        indexes = [
+            models.Index(fields=['-published', '-id'],
+                         name='recipe_published_id_idx'),
+            models.Index(fields=['-favorites_count', '-id'],
+                         name='recipe_favorites_count_idx'),
+        ]
         verbose_name = 'рецепт'
         verbose_name_plural = 'Рецепты'
 
@@ -183,7 +211,8 @@ class ShortLink(models.Model):
         null=True, blank=True,
         verbose_name='рецепт'
     )
-    short_code_path = models.CharField(max_length=4, blank=True,
+    short_code_path = models.CharField(max_length=SHORT_CODE_LENGTH,
+                                       unique=True,
                                        verbose_name='код для короткой ссылки')
     original_path = models.URLField(max_length=300,
                                     verbose_name='оригинальная ссылка')
@@ -194,3 +223,40 @@ class ShortLink(models.Model):
 
     def __str__(self):
         return f'/s/{self.short_code_path} -> {self.original_path}'[:LEN_LIMIT]
+
+
+class ShoppingListItem(models.Model):
+
+    """
+    Модель списка покупок пользователя.
+    Хранит суммарное количество ингредиента по всем рецептам корзины
+    и обновляется вместе с корзиной и ингредиентами рецептов.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE,
+                                   verbose_name='Ингредиент')
+    total_amount = models.PositiveIntegerField(
+        verbose_name='Общее количество'
+    )
+
+    class Meta:
+
+        """Один ингредиент в списке покупок пользователя - одна строка."""
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='%(app_label)s _ %(class)s _unique_relationships',
+            )]
+        default_related_name = 'shopping_list'
+        verbose_name = 'позиция списка покупок'
+        verbose_name_plural = 'Списки покупок'
+
+    def __str__(self):
+        return (f'{self.ingredient} - {self.total_amount} '
+                f'у {self.user}')[:LEN_LIMIT]
@@ -0,0 +1,140 @@
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+SQLITE_TABLE = 'recipes_recipe_fts'
+POSTGRES_TABLE = 'recipes_recipe_search'
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('russian', %s), 'A') || "
+    "setweight(to_tsvector('russian', %s), 'B')"
+)
+POSTGRES_QUERY = "websearch_to_tsquery('russian', %s)"
+
+
+def normalize_text(value):
+
+    """Замена ё на е: ни FTS5, ни словарь russian их не отождествляют."""
+
+    return value.replace('ё', 'е').replace('Ё', 'Е')
+
+
+def rebuild_search_index(db_connection=connection):
+
+    """Полное перестроение индекса по таблице рецептов."""
+
+    with db_connection.cursor() as cursor:
+        cursor.execute('SELECT id, name, text FROM recipes_recipe')
+        recipes = cursor.fetchall()
+    with db_connection.cursor() as cursor:
+        if db_connection.vendor == 'sqlite':
+            cursor.execute(f'DELETE FROM {SQLITE_TABLE}')
+            cursor.executemany(
+                f'INSERT INTO {SQLITE_TABLE} (rowid, name, text) '
+                'VALUES (%s, %s, %s)',
+                [(recipe_id, normalize_text(name), normalize_text(text))
+                 for recipe_id, name, text in recipes]
+            )
+        elif db_connection.vendor == 'postgresql':
+            cursor.execute(f'DELETE FROM {POSTGRES_TABLE}')
+            cursor.executemany(
+                f'INSERT INTO {POSTGRES_TABLE} (recipe_id, document) '
+                f'VALUES (%s, {POSTGRES_DOCUMENT})',
+                [(recipe_id, normalize_text(name), normalize_text(text))
+                 for recipe_id, name, text in recipes]
+            )
+
+
+def update_recipe_search(recipe):
+
+    """Добавление/обновление рецепта в полнотекстовом индексе."""
+
+    name = normalize_text(recipe.name)
+    text = normalize_text(recipe.text)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'DELETE FROM {SQLITE_TABLE} WHERE rowid = %s',
+                           [recipe.id])
+            cursor.execute(
+                f'INSERT INTO {SQLITE_TABLE} (rowid, name, text) '
+                'VALUES (%s, %s, %s)', [recipe.id, name, text]
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                f'INSERT INTO {POSTGRES_TABLE} (recipe_id, document) '
+                f'VALUES (%s, {POSTGRES_DOCUMENT}) '
+                'ON CONFLICT (recipe_id) '
+                'DO UPDATE SET document = EXCLUDED.document',
+                [recipe.id, name, text]
+            )
+
+
+def delete_recipe_search(recipe_id):
+
+    """Удаление рецепта из полнотекстового индекса."""
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'DELETE FROM {SQLITE_TABLE} WHERE rowid = %s',
+                           [recipe_id])
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                f'DELETE FROM {POSTGRES_TABLE} WHERE recipe_id = %s',
+                [recipe_id]
+            )
+
+
+def get_fts5_query(query):
+
+    """
+    Запрос FTS5 из пользовательской строки: каждое слово в кавычках
+    ищется по префиксу, спецсимволы синтаксиса FTS5 отбрасываются.
+    """
+
+    words = re.findall(r'\w+', normalize_text(query))
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_recipes(queryset, query):
+
+    """
+    Фильтрация рецептов по полнотекстовому запросу.
+    Queryset аннотируется полем search_rank и сортируется по нему.
+    """
+
+    query = query.strip()
+    if not query:
+        return queryset
+    if connection.vendor == 'sqlite':
+        fts_query = get_fts5_query(query)
+        if not fts_query:
+            return queryset.none()
+        matches = RawSQL(
+            f'SELECT rowid FROM {SQLITE_TABLE} '
+            f'WHERE {SQLITE_TABLE} MATCH %s', [fts_query]
+        )
+        rank = RawSQL(
+            f'SELECT -bm25({SQLITE_TABLE}, 2.0, 1.0) FROM {SQLITE_TABLE} '
+            f'WHERE {SQLITE_TABLE} MATCH %s '
+            f'AND rowid = "recipes_recipe"."id"', [fts_query],
+            output_field=FloatField()
+        )
+    elif connection.vendor == 'postgresql':
+        query = normalize_text(query)
+        matches = RawSQL(
+            f'SELECT recipe_id FROM {POSTGRES_TABLE} '
+            f'WHERE document @@ {POSTGRES_QUERY}', [query]
+        )
+        rank = RawSQL(
+            f'SELECT ts_rank(document, {POSTGRES_QUERY}) '
+            f'FROM {POSTGRES_TABLE} '
+            'WHERE recipe_id = "recipes_recipe"."id"', [query],
+            output_field=FloatField()
+        )
+    else:
+        return queryset.filter(Q(name__icontains=query)
+                               | Q(text__icontains=query))
+    return queryset.filter(id__in=matches).annotate(
+        search_rank=rank
+    ).order_by('-search_rank', '-published')
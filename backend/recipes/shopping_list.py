@@ -0,0 +1,171 @@
+from collections import defaultdict
+
+from django.db import connections, transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from foodgram_backend.constants import SHOPPING_LIST_BATCH_SIZE
+from recipes.models import IngredientInRecipe, ShoppingCart, ShoppingListItem
+
+
+def batches(items, size=SHOPPING_LIST_BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def increase_shopping_list_items(increments):
+
+    """
+    Увеличение позиций списков покупок.
+    increments - список (user_id, ingredient_id, количество).
+    INSERT ... ON CONFLICT DO UPDATE создает недостающие строки и
+    увеличивает существующие одним запросом: параллельные транзакции,
+    добавляющие одну и ту же позицию, не получают IntegrityError.
+    """
+
+    table = ShoppingListItem._meta.db_table
+    with connections[ShoppingListItem.objects.db].cursor() as cursor:
+        for batch in batches(increments):
+            values = ', '.join(['(%s, %s, %s)'] * len(batch))
+            cursor.execute(
+                f'INSERT INTO {table} (user_id, ingredient_id, total_amount) '
+                f'VALUES {values} ON CONFLICT (user_id, ingredient_id) '
+                f'DO UPDATE SET total_amount = '
+                f'{table}.total_amount + EXCLUDED.total_amount',
+                [value for row in batch for value in row]
+            )
+
+
+def decrease_shopping_list_items(decrements):
+
+    """
+    Уменьшение позиций списков покупок.
+    decrements - список (user_id, ingredient_id, количество).
+    Количество не опускается ниже нуля, позиции с нулевым итогом удаляются.
+    """
+
+    for batch in batches(decrements):
+        user_ids = {user_id for user_id, _, _ in batch}
+        ingredient_ids = {ingredient_id for _, ingredient_id, _ in batch}
+        items = ShoppingListItem.objects.filter(
+            user_id__in=user_ids, ingredient_id__in=ingredient_ids
+        )
+        items.update(total_amount=Greatest(
+            F('total_amount') - Case(
+                *(When(user_id=user_id, ingredient_id=ingredient_id,
+                       then=Value(amount))
+                  for user_id, ingredient_id, amount in batch),
+                default=Value(0), output_field=IntegerField()
+            ),
+            Value(0)
+        ))
+        items.filter(total_amount=0).delete()
+
+
+@transaction.atomic
+def apply_shopping_list_changes(changes):
+
+    """
+    Применение изменений к спискам покупок.
+    changes - словарь {(user_id, ingredient_id): изменение количества}.
+    Строки не читаются перед записью: в SQLite транзакция, начатая
+    с чтения, не может получить блокировку записи при конкуренции.
+    """
+
+    increments = []
+    decrements = []
+    for (user_id, ingredient_id), delta in changes.items():
+        if delta > 0:
+            increments.append((user_id, ingredient_id, delta))
+        elif delta < 0:
+            decrements.append((user_id, ingredient_id, -delta))
+    if increments:
+        increase_shopping_list_items(increments)
+    if decrements:
+        decrease_shopping_list_items(decrements)
+
+
+def update_shopping_list(user_id, recipe_ids, sign=1):
+
+    """Добавление(sign=1)/удаление(sign=-1) рецептов в списке покупок."""
+
+    changes = defaultdict(int)
+    ingredients = IngredientInRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('ingredient_id', 'amount')
+    for ingredient_id, amount in ingredients:
+        changes[(user_id, ingredient_id)] += sign * amount
+    apply_shopping_list_changes(changes)
+
+
+def update_shopping_lists_for_recipe(recipe, old_amounts, new_amounts):
+
+    """
+    Пересчет списков покупок после изменения ингредиентов рецепта.
+    old_amounts и new_amounts - словари {ingredient_id: amount}.
+    """
+
+    deltas = {
+        ingredient_id: (new_amounts.get(ingredient_id, 0)
+                        - old_amounts.get(ingredient_id, 0))
+        for ingredient_id in old_amounts.keys() | new_amounts.keys()
+    }
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    user_ids = ShoppingCart.objects.filter(
+        recipe=recipe).values_list('user_id', flat=True)
+    apply_shopping_list_changes({
+        (user_id, ingredient_id): delta
+        for user_id in user_ids
+        for ingredient_id, delta in deltas.items()
+    })
+
+
+def get_expected_shopping_lists():
+
+    """Списки покупок, вычисленные по корзинам: {(user, ingr): amount}."""
+
+    rows = ShoppingCart.objects.values(
+        'user_id', ingredient_id=F('recipe__ingredients_in_recipe__ingredient')
+    ).annotate(
+        total=Sum('recipe__ingredients_in_recipe__amount')
+    ).filter(ingredient_id__isnull=False).values_list(
+        'user_id', 'ingredient_id', 'total'
+    ).order_by()
+    return {(user_id, ingredient_id): total
+            for user_id, ingredient_id, total in rows}
+
+
+def get_shopping_lists_diff():
+
+    """Расхождения таблицы списков покупок с корзинами."""
+
+    expected = get_expected_shopping_lists()
+    actual = {
+        (user_id, ingredient_id): total
+        for user_id, ingredient_id, total in
+        ShoppingListItem.objects.values_list(
+            'user_id', 'ingredient_id', 'total_amount'
+        )
+    }
+    return {
+        key: (actual.get(key), expected.get(key))
+        for key in actual.keys() | expected.keys()
+        if actual.get(key) != expected.get(key)
+    }
+
+
+@transaction.atomic
+def rebuild_shopping_lists():
+
+    """Полное перестроение таблицы списков покупок по корзинам."""
+
+    ShoppingListItem.objects.all().delete()
+    ShoppingListItem.objects.bulk_create(
+        (ShoppingListItem(user_id=user_id, ingredient_id=ingredient_id,
+                          total_amount=total)
+         for (user_id, ingredient_id), total
+         in get_expected_shopping_lists().items()),
+        batch_size=1000
+    )
@@ -0,0 +1,49 @@
+import hashlib
+import hmac
+import string
+
+from django.conf import settings
+
+from foodgram_backend.constants import SHORT_CODE_LENGTH
+
+ALPHABET = string.digits + string.ascii_lowercase + string.ascii_uppercase
+HALF_SIZE = len(ALPHABET) ** (SHORT_CODE_LENGTH // 2)
+FEISTEL_ROUNDS = 4
+
+
+def _round_function(value, round_number):
+    digest = hmac.new(settings.SHORT_LINK_KEY.encode(),
+                      f'{round_number}:{value}'.encode(),
+                      hashlib.sha256).digest()
+    return int.from_bytes(digest[:8], 'big') % HALF_SIZE
+
+
+def permute(number):
+
+    """
+    Ключевая перестановка чисел [0, HALF_SIZE ** 2) сетью Фейстеля.
+    Разные числа всегда дают разные результаты, поэтому коды,
+    полученные из id рецептов, не пересекаются.
+    """
+
+    left, right = divmod(number, HALF_SIZE)
+    for round_number in range(FEISTEL_ROUNDS):
+        left, right = right, (left + _round_function(right, round_number)
+                              ) % HALF_SIZE
+    return left * HALF_SIZE + right
+
+
+def get_short_code(recipe_id):
+
+    """Код короткой ссылки рецепта: base62 от перестановки его id."""
+
+    number = permute(recipe_id)
+    code = []
+    for _ in range(SHORT_CODE_LENGTH):
+        number, digit = divmod(number, len(ALPHABET))
+        code.append(ALPHABET[digit])
+    return ''.join(reversed(code))
+
+
+def get_original_path(recipe_id):
+    return f'/recipes/{recipe_id}'
@@ -0,0 +1,115 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from recipes.counters import change_favorites_count, change_recipes_count
+from recipes.models import (Favorite, Ingredient, Recipe, ShoppingCart,
+                            ShortLink, Tag)
+from recipes.search import delete_recipe_search, update_recipe_search
+from recipes.short_codes import get_original_path, get_short_code
+from recipes.shopping_list import update_shopping_list
+from users.state import bump_state_version
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_recipe_to_shopping_list(sender, instance, created, raw, **kwargs):
+
+    """Добавление ингредиентов рецепта в список покупок."""
+
+    if created and not raw:
+        update_shopping_list(instance.user_id, [instance.recipe_id])
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_recipe_from_shopping_list(sender, instance, **kwargs):
+
+    """
+    Удаление ингредиентов рецепта из списка покупок.
+    pre_delete срабатывает до каскадного удаления ингредиентов рецепта.
+    """
+
+    update_shopping_list(instance.user_id, [instance.recipe_id], sign=-1)
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe(sender, instance, **kwargs):
+
+    """Обновление рецепта в полнотекстовом индексе."""
+
+    update_recipe_search(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def create_short_link(sender, instance, created, raw, **kwargs):
+
+    """Короткая ссылка создается вместе с рецептом."""
+
+    if created and not raw:
+        ShortLink.objects.create(
+            recipe=instance,
+            short_code_path=get_short_code(instance.id),
+            original_path=get_original_path(instance.id)
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_recipe(sender, instance, **kwargs):
+
+    """Удаление рецепта из полнотекстового индекса."""
+
+    delete_recipe_search(instance.id)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def bump_user_state(sender, instance, raw=False, **kwargs):
+
+    """Избранное и корзина меняют ответы с рецептами для пользователя."""
+
+    if not raw:
+        bump_state_version(instance.user_id)
+
+
+@receiver(post_save, sender=Favorite)
+def increment_favorites_count(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        change_favorites_count([instance.recipe_id], 1)
+
+
+@receiver(post_delete, sender=Favorite)
+def decrement_favorites_count(sender, instance, **kwargs):
+    change_favorites_count([instance.recipe_id], -1)
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        change_recipes_count(instance.author_id, 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    change_recipes_count(instance.author_id, -1)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def touch_related_recipes(sender, instance, raw=False, created=False,
+                          **kwargs):
+
+    """
+    Названия тегов и ингредиентов входят в ответ с рецептом, поэтому
+    их изменение и удаление обновляет дату изменения рецептов (ETag
+    и Last-Modified рецепта).
+    """
+
+    if raw or created:
+        return
+    lookup = 'tags' if sender is Tag else 'ingredients'
+    Recipe.objects.filter(**{lookup: instance}).update(
+        updated_at=timezone.now()
+    )
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newuser',
+            name='state_updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='дата изменения избранного, корзины и подписок'),
+        ),
+        migrations.AddField(
+            model_name='newuser',
+            name='state_version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='версия избранного, корзины и подписок'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:29
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_related(Model, field):
+    return Coalesce(Subquery(
+        Model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total'),
+        output_field=models.PositiveIntegerField()
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    NewUser = apps.get_model('users', 'NewUser')
+    Following = apps.get_model('users', 'Following')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    NewUser.objects.update(
+        recipes_count=count_related(Recipe, 'author'),
+        followers_count=count_related(Following, 'following')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_state_version'),
+        ('recipes', '0013_recipe_favorites_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newuser',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='число подписчиков'),
+        ),
+        migrations.AddField(
+            model_name='newuser',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='число рецептов'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newuser',
+            name='avatar_thumbnails_ready',
+            field=models.BooleanField(default=False, editable=False, verbose_name='уменьшенные копии аватара созданы'),
+        ),
+    ]
@@ -2,12 +2,17 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 
 from foodgram_backend.constants import LEN_LIMIT
+from foodgram_backend.mixins import DenormalizedFieldsMixin
 
 
-class NewUser(AbstractUser):
+class NewUser(DenormalizedFieldsMixin, AbstractUser):
 
     """Кастомная модель пользователя."""
 
+    denormalized_fields = ('state_version', 'state_updated_at',
+                           'recipes_count', 'followers_count',
+                           'avatar_thumbnails_ready')
+
     email = models.EmailField(blank=False,
                               unique=True,
                               verbose_name='электронная почта',
@@ -16,6 +21,24 @@ class NewUser(AbstractUser):
     avatar = models.ImageField(upload_to='users/',
                                null=True, default=None,
                                blank=True)
+    avatar_thumbnails_ready = models.BooleanField(
+        default=False, editable=False,
+        verbose_name='уменьшенные копии аватара созданы'
+    )
+    state_version = models.PositiveIntegerField(
+        default=0, editable=False,
+        verbose_name='версия избранного, корзины и подписок'
+    )
+    state_updated_at = models.DateTimeField(
+        null=True, blank=True, editable=False,
+        verbose_name='дата изменения избранного, корзины и подписок'
+    )
+    recipes_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='число рецептов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='число подписчиков'
+    )
 
     class Meta:
 
@@ -0,0 +1,48 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from recipes.counters import change_followers_count
+from recipes.models import Recipe
+from users.models import Following, NewUser
+from users.state import bump_state_version
+
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name', 'avatar'}
+
+
+@receiver(post_save, sender=Following)
+@receiver(post_delete, sender=Following)
+def bump_follower_state(sender, instance, raw=False, **kwargs):
+
+    """Подписка меняет is_subscribed в ответах для подписчика."""
+
+    if not raw:
+        bump_state_version(instance.user_id)
+
+
+@receiver(post_save, sender=Following)
+def increment_followers_count(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        change_followers_count(instance.following_id, 1)
+
+
+@receiver(post_delete, sender=Following)
+def decrement_followers_count(sender, instance, **kwargs):
+    change_followers_count(instance.following_id, -1)
+
+
+@receiver(post_save, sender=NewUser)
+def touch_author_recipes(sender, instance, created, update_fields, raw,
+                         **kwargs):
+
+    """
+    Данные автора входят в ответ с рецептом, поэтому их изменение
+    обновляет дату изменения его рецептов. Сохранение last_login
+    при входе пропускается.
+    """
+
+    if created or raw:
+        return
+    if update_fields is not None and not AUTHOR_FIELDS & set(update_fields):
+        return
+    Recipe.objects.filter(author=instance).update(updated_at=timezone.now())
@@ -0,0 +1,18 @@
+from django.db.models import F
+from django.utils import timezone
+
+from users.models import NewUser
+
+
+def bump_state_version(*user_ids):
+
+    """
+    Увеличение версии избранного, корзины и подписок пользователей.
+    Версия входит в ETag ленты рецептов, поэтому ответы, зависящие
+    от состояния пользователя, перестают считаться актуальными.
+    """
+
+    NewUser.objects.filter(id__in=user_ids).update(
+        state_version=F('state_version') + 1,
+        state_updated_at=timezone.now()
+    )